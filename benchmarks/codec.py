@@ -0,0 +1,115 @@
+"""
+Measures how fast the available codecs of :mod:`bedrock.codec` decode and
+encode messages as they are exchanged with a client, and how fast they peek
+at the header of a message compared to decoding all of it.
+"""
+
+import time
+
+from bedrock import codec
+
+N = 50_000
+
+PLAYER = {
+    "color": "ffededed",
+    "dimension": 0,
+    "id": -4294967295,
+    "name": "Steve",
+    "position": {"x": 12.5, "y": 64.62000274658203, "z": -118.30000305175781},
+    "type": "minecraft:player",
+    "variant": 0,
+    "yRot": 174.8560791015625,
+}
+
+MESSAGES = [
+    {
+        "header": {
+            "eventName": "PlayerTravelled",
+            "messagePurpose": "event",
+            "version": 16842752,
+        },
+        "body": {
+            "isUnderwater": False,
+            "metersTravelled": 0.5462232232093811,
+            "newBiome": 1,
+            "player": PLAYER,
+            "travelMethod": 0,
+        },
+    },
+    {
+        "header": {
+            "eventName": "BlockBroken",
+            "messagePurpose": "event",
+            "version": 16842752,
+        },
+        "body": {
+            "block": {"aux": 0, "id": "stone", "namespace": "minecraft"},
+            "count": 1,
+            "destructionMethod": 0,
+            "player": PLAYER,
+            "tool": {
+                "aux": 0,
+                "enchantments": [],
+                "freeStackSize": 0,
+                "id": "diamond_pickaxe",
+                "maxStackSize": 1,
+                "namespace": "minecraft",
+                "stackSize": 1,
+            },
+            "variant": 0,
+        },
+    },
+    {
+        "header": {
+            "eventName": "PlayerMessage",
+            "messagePurpose": "event",
+            "version": 16842752,
+        },
+        "body": {
+            "message": "Hello World!",
+            "receiver": "",
+            "sender": "Steve",
+            "type": "chat",
+        },
+    },
+    {
+        "header": {
+            "messagePurpose": "commandResponse",
+            "requestId": "ef4fec12-4c80-48db-b7e8-000000000001",
+            "version": 16842752,
+        },
+        "body": {"statusCode": 0, "statusMessage": "Block placed"},
+    },
+]
+
+
+def main() -> None:
+    reference = codec.get_codec("json")
+    frames = [reference.dumps(message) for message in MESSAGES]
+    print(f"{'codec':>8} {'decode':>14} {'encode':>14} {'peek':>14}")
+    for name in ("json", "orjson", "msgspec"):
+        try:
+            c = codec.get_codec(name)
+        except ImportError:
+            print(f"{name:>8} {'not installed':>14}")
+            continue
+        start = time.perf_counter()
+        for _ in range(N):
+            for frame in frames:
+                c.loads(frame)
+        decode = N * len(frames) / (time.perf_counter() - start)
+        start = time.perf_counter()
+        for _ in range(N):
+            for message in MESSAGES:
+                c.dumps(message)
+        encode = N * len(frames) / (time.perf_counter() - start)
+        start = time.perf_counter()
+        for _ in range(N):
+            for frame in frames:
+                c.peek_header(frame)
+        peek = N * len(frames) / (time.perf_counter() - start)
+        print(f"{name:>8} {decode:>10,.0f} f/s {encode:>10,.0f} f/s {peek:>10,.0f} f/s")
+
+
+if __name__ == "__main__":
+    main()
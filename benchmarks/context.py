@@ -0,0 +1,67 @@
+"""
+Measures the cost of creating a game context and accessing the fields a
+typical ``player_travelled`` handler uses.
+"""
+
+import time
+
+from bedrock.context import PlayerTravelledContext
+from bedrock.server import Server
+
+N = 200_000
+
+DATA = {
+    "isUnderwater": False,
+    "metersTravelled": 0.5462232232093811,
+    "newBiome": 1,
+    "player": {
+        "color": "ffededed",
+        "dimension": 0,
+        "id": -4294967295,
+        "name": "Steve",
+        "position": {"x": 12.5, "y": 64.62000274658203, "z": -118.30000305175781},
+        "type": "minecraft:player",
+        "variant": 0,
+        "yRot": 174.8560791015625,
+    },
+    "travelMethod": 0,
+}
+
+
+def bench(name: str, fn) -> None:  # type: ignore[no-untyped-def]
+    start = time.perf_counter()
+    for _ in range(N):
+        fn()
+    elapsed = time.perf_counter() - start
+    print(f"{name:>28}: {elapsed / N * 1e9:>6.0f}ns/event")
+
+
+def main() -> None:
+    server = Server()
+
+    def raw() -> None:
+        player = DATA["player"]
+        position = player["position"]  # type: ignore[index]
+        player["name"], position["x"], position["y"], position["z"]  # type: ignore[index]
+
+    def world_coordinates() -> None:
+        ctx = PlayerTravelledContext(server, DATA)
+        ctx.player, ctx.player_position, ctx.player_position
+
+    def vector() -> None:
+        ctx = PlayerTravelledContext(server, DATA)
+        ctx.player, ctx.position, ctx.position
+
+    def record() -> None:
+        ctx = PlayerTravelledContext(server, DATA)
+        r = ctx.record
+        r.player, r.position, r.meters, r.underwater
+
+    bench("raw handler", raw)
+    bench("context + player_position", world_coordinates)
+    bench("context + position", vector)
+    bench("context + record", record)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Measures how many ``commandRequest`` frames per second can be built.
+
+The previous path (merging the header, building the body and serializing the
+whole request with :func:`json.dumps`) is compared with
+:class:`bedrock.envelope.CommandEnvelope`.
+"""
+
+import json
+import time
+import uuid
+
+from bedrock import consts
+from bedrock.envelope import get_envelope
+
+N = 200_000
+HEADER = {"messageType": "commandRequest", "messagePurpose": "commandRequest"}
+
+
+def bench_dumps(request_ids: list[str], commands: list[str]) -> float:
+    start = time.perf_counter()
+    for request_id, command in zip(request_ids, commands):
+        json.dumps(
+            {
+                "header": HEADER | {"version": 1, "requestId": request_id},
+                "body": {
+                    "version": consts.MINECRAFT_VERSION,
+                    "commandLine": command,
+                    "origin": {"type": "player"},
+                },
+            }
+        )
+    return time.perf_counter() - start
+
+
+def bench_envelope(request_ids: list[str], commands: list[str]) -> float:
+    start = time.perf_counter()
+    for request_id, command in zip(request_ids, commands):
+        get_envelope().render(request_id, command)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    request_ids = [str(uuid.uuid4()) for _ in range(N)]
+    commands = [f"setblock {i} 64 {i} stone" for i in range(N)]
+    for name, bench in (("json.dumps", bench_dumps), ("envelope", bench_envelope)):
+        elapsed = bench(request_ids, commands)
+        print(f"{name:>12}: {N / elapsed:>12,.0f} frames/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Compares sending commands nobody waits for with
+:meth:`bedrock.session.Session.run` (``wait=False``) and
+:meth:`bedrock.session.Session.fire`.
+
+The commands are sent to a client running in the same process which responds
+to every command right away. The time is measured until the last response
+arrived and the memory with :mod:`tracemalloc` in a second run, as tracing
+slows everything down.
+"""
+
+import asyncio
+import json
+import time
+import tracemalloc
+
+import websockets
+
+from bedrock.server import Server
+from bedrock.session import Session
+
+HOST, PORT = "127.0.0.1", 6498
+COMMANDS = 100_000
+
+
+async def client() -> None:
+    async with websockets.connect(f"ws://{HOST}:{PORT}") as ws:
+        async for message in ws:
+            request_id = json.loads(message)["header"]["requestId"]
+            await ws.send(
+                '{"header":{"messagePurpose":"commandResponse","requestId":"%s"},'
+                '"body":{"statusCode":0}}' % request_id
+            )
+
+
+async def run(session: Session) -> None:
+    for i in range(COMMANDS):
+        await session.run(f"say {i}", wait=False)
+    while session.in_flight():
+        await asyncio.sleep(0.001)
+
+
+async def fire(session: Session) -> None:
+    for i in range(COMMANDS):
+        await session.fire(f"say {i}")
+    while session.fire_stats.in_flight:
+        await asyncio.sleep(0.001)
+
+
+async def measure(session: Session, mode, traced: bool):  # type: ignore[no-untyped-def]
+    if traced:
+        tracemalloc.start()
+    start = time.perf_counter()
+    cpu = time.process_time()
+    await mode(session)
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu
+    peak = 0
+    if traced:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return elapsed, cpu, peak
+
+
+app = Server()
+
+
+@app.server_event
+async def ready(ctx):  # type: ignore[no-untyped-def]
+    asyncio.get_running_loop().create_task(client())
+
+
+@app.server_event
+async def connect(ctx):  # type: ignore[no-untyped-def]
+    print(f"{COMMANDS:,} commands")
+    print(f"{'mode':>6} {'time':>8} {'cpu':>8} {'per command':>12} {'peak memory':>12}")
+    for name, mode in (("run", run), ("fire", fire)):
+        elapsed, cpu, _ = await measure(ctx.session, mode, traced=False)
+        _, _, peak = await measure(ctx.session, mode, traced=True)
+        print(
+            f"{name:>6} {elapsed:>7.2f}s {cpu:>7.2f}s"
+            f" {cpu / COMMANDS * 1e6:>10.1f}µs {peak / 1024:>9.0f} KiB"
+        )
+    await ctx.session.close()
+    asyncio.get_running_loop().stop()
+
+
+if __name__ == "__main__":
+    app.start(HOST, PORT)
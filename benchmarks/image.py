@@ -0,0 +1,56 @@
+"""
+Measures how fast :mod:`bedrock.ext.worldedit.image` maps a 512×512 image to
+blocks and how many commands are needed to place it.
+"""
+
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from bedrock.ext import worldedit
+from bedrock.ext.worldedit import image
+
+SIZE = 512
+
+
+def picture() -> np.ndarray:
+    """A smooth gradient with a few sharp shapes on top of it."""
+    y, x = np.mgrid[:SIZE, :SIZE] / SIZE
+    rgb = np.stack((x, y, 1 - x * y), axis=-1) * 255
+    rgb[SIZE // 4 : SIZE // 2, SIZE // 4 : SIZE // 2] = (200, 30, 30)
+    rgb[(x - 0.7) ** 2 + (y - 0.7) ** 2 < 0.02] = (20, 20, 20)
+    return rgb.astype(np.uint8)
+
+
+def bench(name: str, fn) -> None:  # type: ignore[no-untyped-def]
+    start = time.perf_counter()
+    fn()
+    print(f"{name:>24}: {(time.perf_counter() - start) * 1e3:>8.1f}ms")
+
+
+def main() -> None:
+    rgb = picture()
+    with tempfile.TemporaryDirectory() as cache:
+        os.environ["XDG_CACHE_HOME"] = cache
+        bench("compute lookup table", lambda: image.lut(image.CONCRETE))
+        image._luts.clear()
+        bench("load lookup table", lambda: image.lut(image.CONCRETE))
+    bench("quantize", lambda: image.quantize(rgb, image.CONCRETE))
+    bench(
+        "quantize with dither",
+        lambda: image.quantize(rgb, image.CONCRETE, dither=True),
+    )
+
+    for dither in (False, True):
+        pixels = image.quantize(rgb, image.CONCRETE, dither=dither)
+        boxes = worldedit.mesh(pixels.T[:, None, :])
+        print(
+            f"{'dithered' if dither else 'plain':>24}: {pixels.size:,} pixels in"
+            f" {len(boxes):,} commands"
+        )
+
+
+if __name__ == "__main__":
+    main()
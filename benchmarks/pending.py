@@ -0,0 +1,69 @@
+"""
+Measures the cost of correlating a command response with its pending request
+depending on the amount of requests in flight.
+
+The linear scan over a list (as it was done before) is compared with
+:class:`bedrock.pending.PendingRequests`.
+"""
+
+import asyncio
+import time
+
+from bedrock.pending import PendingRequests
+from bedrock.request import CommandRequest, RequestIds
+
+SIZES = (1, 10, 100, 1_000, 10_000)
+ROUNDS = 20_000
+
+
+def make_requests(loop: asyncio.AbstractEventLoop, n: int) -> list[CommandRequest]:
+    request_ids = RequestIds()
+    return [
+        CommandRequest(
+            request_id=request_ids(), frame="", response=loop.create_future()
+        )
+        for _ in range(n)
+    ]
+
+
+def bench_list(requests: list[CommandRequest], rounds: int) -> float:
+    pending = list(requests)
+    start = time.perf_counter()
+    for i in range(rounds):
+        # respond to the oldest request and send a new one with the same id
+        request_id = pending[i % len(pending)].request_id
+        for req in pending:
+            if req.request_id == request_id:
+                pending.remove(req)
+                pending.append(req)
+                break
+    return (time.perf_counter() - start) / rounds
+
+
+def bench_index(requests: list[CommandRequest], rounds: int) -> float:
+    pending = PendingRequests()
+    for req in requests:
+        pending.add(req)
+    start = time.perf_counter()
+    for i in range(rounds):
+        request_id = requests[i % len(requests)].request_id
+        req = pending.pop(request_id)
+        assert req is not None
+        pending.add(req)
+    return (time.perf_counter() - start) / rounds
+
+
+def main() -> None:
+    loop = asyncio.new_event_loop()
+    print(f"{'in flight':>10} {'list scan':>12} {'index':>12}")
+    for n in SIZES:
+        requests = make_requests(loop, n)
+        rounds = ROUNDS if n <= 1_000 else ROUNDS // 10
+        linear = bench_list(requests, rounds)
+        indexed = bench_index(requests, ROUNDS)
+        print(f"{n:>10} {linear * 1e9:>10.0f}ns {indexed * 1e9:>10.0f}ns")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Compares placing structures with :mod:`bedrock.ext.worldedit` to placing
+them block by block with one ``setblock`` command each.
+
+The commands are sent to a client running in the same process which responds
+to every command right away, so the times measured are the overhead of the
+library. A game client takes longer to execute each command which makes the
+amount of commands even more important.
+
+Placing the larger structures block by block would take too long, so the
+time is extrapolated from the rate measured for the first commands.
+"""
+
+import asyncio
+import json
+import time
+
+import numpy as np
+import websockets
+
+from bedrock.ext import worldedit
+from bedrock.server import Server
+
+HOST, PORT = "127.0.0.1", 6499
+SIZES = (64, 256)
+SAMPLE = 20_000
+PALETTE = ["air", "stone", "dirt", "grass", "glass"]
+
+
+def structure(size: int) -> np.ndarray:
+    """A landscape with hills and a hollow house of glass."""
+    rng = np.random.default_rng(0)
+    blocks = np.zeros((size, size, size), dtype=np.int32)
+    ground = size // 3
+    blocks[:, : ground - 4, :] = 1
+    blocks[:, ground - 4 : ground - 1, :] = 2
+    blocks[:, ground - 1, :] = 3
+    columns = blocks.transpose(0, 2, 1)
+    xs, zs = np.ogrid[:size, :size]
+    for _ in range(size // 8):
+        x, z = rng.integers(0, size, 2)
+        r = int(rng.integers(2, max(3, size // 8)))
+        hill = (xs - x) ** 2 + (zs - z) ** 2 <= r**2
+        columns[hill, ground : ground + r // 2] = 3
+    a, b = size // 4, 3 * size // 4
+    blocks[a:b, ground : ground + size // 4, a:b] = 4
+    blocks[a + 1 : b - 1, ground : ground + size // 4 - 1, a + 1 : b - 1] = 0
+    return blocks
+
+
+def naive(blocks: np.ndarray):  # type: ignore[no-untyped-def]
+    for (x, y, z), value in np.ndenumerate(blocks):
+        yield f"setblock {x} {y} {z} {PALETTE[value]}"
+
+
+async def client() -> None:
+    async with websockets.connect(f"ws://{HOST}:{PORT}") as ws:
+        async for message in ws:
+            request_id = json.loads(message)["header"]["requestId"]
+            await ws.send(
+                '{"header":{"messagePurpose":"commandResponse","requestId":"%s"},'
+                '"body":{"statusCode":0}}' % request_id
+            )
+
+
+app = Server()
+
+
+@app.server_event
+async def ready(ctx):  # type: ignore[no-untyped-def]
+    asyncio.get_running_loop().create_task(client())
+
+
+@app.server_event
+async def connect(ctx):  # type: ignore[no-untyped-def]
+    print(
+        f"{'size':>6} {'blocks':>12} {'commands':>10} {'mesh':>8} {'send':>8}"
+        f" {'naive send':>12} {'reduction':>10}"
+    )
+    for size in SIZES:
+        blocks = structure(size)
+
+        start = time.perf_counter()
+        boxes = worldedit.mesh(blocks)
+        meshing = time.perf_counter() - start
+
+        start = time.perf_counter()
+        stats = await ctx.session.run_many(worldedit.commands(boxes, PALETTE)).drain()
+        sending = time.perf_counter() - start
+
+        commands = naive(blocks)
+        start = time.perf_counter()
+        sample = await ctx.session.run_many(
+            next(commands) for _ in range(min(SAMPLE, blocks.size))
+        ).drain()
+        rate = sample.sent / (time.perf_counter() - start)
+
+        print(
+            f"{size:>5}³ {blocks.size:>12,} {stats.sent:>10,} {meshing:>7.2f}s"
+            f" {sending:>7.2f}s {blocks.size / rate:>11.1f}s"
+            f" {blocks.size / stats.sent:>9.0f}×"
+        )
+    await ctx.session.close()
+    asyncio.get_running_loop().stop()
+
+
+if __name__ == "__main__":
+    app.start(HOST, PORT)
@@ -0,0 +1,41 @@
+"""
+This example is used to test serving multiple clients at once.
+
+Connect two or more clients. A message in the chat is answered to the
+sender's client only, whereas the message ``broadcast`` is sent to every
+connected client.
+"""
+
+import logging
+import os
+
+from bedrock.consts import NAME
+from bedrock.context import ConnectContext, PlayerMessageContext, ReadyContext
+from bedrock.server import Server
+
+logging.basicConfig(level=logging.DEBUG)
+
+app = Server()
+
+
+@app.server_event
+async def ready(ctx: ReadyContext) -> None:
+    print(f"Ready @ {ctx.host}:{ctx.port}")
+
+
+@app.server_event
+async def connect(ctx: ConnectContext) -> None:
+    print(f"{len(app.sessions())} client(s) connected")
+
+
+@app.game_event
+async def player_message(ctx: PlayerMessageContext) -> None:
+    if ctx.sender == NAME:
+        return
+    if ctx.message == "broadcast":
+        await ctx.server.broadcast(f"say {ctx.sender} says hello to everyone")
+    else:
+        await ctx.reply(f"Only your client sees this, {ctx.sender}.")
+
+
+app.start(os.getenv("IP") or "localhost", 6464)
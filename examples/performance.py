@@ -1,5 +1,8 @@
 """
 A message triggers a loop which places a lot of blocks to see how fast it works.
+
+Send ``performance`` to run the commands one after another or
+``performance batch`` to run them with :meth:`bedrock.server.Server.run_many`.
 """
 
 import logging
@@ -28,6 +31,15 @@ async def player_message(ctx: PlayerMessageContext) -> None:
         for i in range(n):
             await ctx.server.run(f"say iteration {i}", wait=False)
         print(f"took {time.time() - now}s to run {n} commands")
+    elif ctx.sender != NAME and ctx.message == "performance batch":
+        n = 1_000
+        stats = await ctx.server.run_many(
+            f"say iteration {i}" for i in range(n)
+        ).drain()
+        print(
+            f"took {stats.elapsed}s to run {n} commands "
+            f"({stats.commands_per_second:.0f} commands/s, {stats.failed} failed)"
+        )
 
 
 app.start(os.getenv("IP") or "0.0.0.0", 6464)
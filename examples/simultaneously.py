@@ -5,6 +5,9 @@ be triggered while another one is running.
 Send a message in the chat which will trigger a lot of messages beeing
 sent by the server. In the meantime, destroy a block and a title should
 appear.
+
+The title is sent in the interactive lane so that it does not wait behind
+the messages which are sent in the bulk lane.
 """
 
 import logging
@@ -13,6 +16,7 @@ import os
 from bedrock.consts import NAME
 from bedrock.context import BlockBrokenContext, PlayerMessageContext, ReadyContext
 from bedrock.server import Server
+from bedrock.window import Lane
 
 logging.basicConfig(level=logging.DEBUG)
 
@@ -26,10 +30,10 @@ async def ready(ctx: ReadyContext) -> None:
 async def player_message(ctx: PlayerMessageContext) -> None:
     if ctx.sender != NAME and ctx.message == "overflow":
         for i in range(150):
-            await ctx.server.run(f"say {i}")
+            await ctx.server.run(f"say {i}", priority=Lane.BULK)
 
 @app.game_event
 async def block_broken(ctx: BlockBrokenContext):
-    await ctx.server.run("title @a title Hello!")
+    await ctx.server.run("title @a title Hello!", priority=Lane.INTERACTIVE)
 
 app.start(os.getenv("IP") or "localhost", 6464)
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterable, AsyncIterator, Generator, Iterable
+import time
+from typing import TYPE_CHECKING, Any
+
+from attrs import define, field
+
+from .response import CommandResponse
+from .window import Lane
+
+if TYPE_CHECKING:
+    from .session import Session
+
+
+_DONE = object()
+
+
+@define
+class BatchStats:
+    """Statistics of a :class:`CommandBatch`."""
+
+    sent: int = 0
+    """The amount of commands sent to the client."""
+
+    completed: int = 0
+    """The amount of commands the client responded to."""
+
+    failed: int = 0
+    """The amount of commands that did not run successfully."""
+
+    elapsed: float = 0.0
+    """The amount of seconds passed since the first command has been sent."""
+
+    @property
+    def commands_per_second(self) -> float:
+        """The amount of completed commands per second."""
+        if self.elapsed <= 0:
+            return 0.0
+        return self.completed / self.elapsed
+
+
+@define
+class FireStats:
+    """Statistics of the commands sent with
+    :meth:`bedrock.session.Session.fire`."""
+
+    sent: int = 0
+    """The amount of commands sent to the client."""
+
+    completed: int = 0
+    """The amount of commands the client responded to."""
+
+    failed: int = 0
+    """The amount of commands that did not run successfully, including those
+    the client rejected."""
+
+    rejected: int = 0
+    """The amount of commands the client rejected because its queue was full.
+    These are not resubmitted."""
+
+    @property
+    def in_flight(self) -> int:
+        """The amount of commands awaiting a response."""
+        return self.sent - self.completed
+
+
+@define
+class CommandBatch:
+    """Many commands executed one after another.
+
+    The commands are sent as soon as the client has room for them and their
+    responses are yielded in the order of the commands. Use
+    :meth:`bedrock.session.Session.run_many` or
+    :meth:`bedrock.server.Server.run_many` to create a batch.
+
+    A batch can only be consumed once: either by iterating over it with
+    ``async for``, by awaiting it (or :meth:`results`) to get a list of all
+    responses or by calling :meth:`drain` to discard the responses.
+    """
+
+    _session: Session
+    _commands: Iterable[str] | AsyncIterable[str]
+    _version: str | list[str] | None = field(default=None, kw_only=True)
+    _origin: str = field(default="player", kw_only=True)
+    _priority: Lane = field(default=Lane.NORMAL, kw_only=True)
+    _timeout: float | None = field(default=None, kw_only=True)
+    _stats: BatchStats = field(init=False, factory=BatchStats)
+    _started: float | None = field(init=False, default=None)
+    _stopped: float | None = field(init=False, default=None)
+    _consumed: bool = field(init=False, default=False)
+
+    @property
+    def stats(self) -> BatchStats:
+        """The statistics of the batch so far."""
+        if self._started is not None:
+            stopped = self._stopped or time.perf_counter()
+            self._stats.elapsed = stopped - self._started
+        return self._stats
+
+    async def _produce(self, queue: asyncio.Queue[Any]) -> None:
+        try:
+            if isinstance(self._commands, AsyncIterable):
+                async for command in self._commands:
+                    await self._put(queue, command)
+            else:
+                for command in self._commands:
+                    await self._put(queue, command)
+        except Exception as e:
+            await queue.put(e)
+        else:
+            await queue.put(_DONE)
+
+    async def _put(self, queue: asyncio.Queue[Any], command: str) -> None:
+        future = await self._session._submit_command(
+            command, self._version, self._origin, self._priority, self._timeout
+        )
+        self._stats.sent += 1
+        await queue.put(future)
+
+    async def __aiter__(self) -> AsyncIterator[CommandResponse]:
+        if self._consumed:
+            raise RuntimeError("batch has already been consumed")
+        self._consumed = True
+
+        # Twice the window so that the window stays filled while the response
+        # at the head of the queue is awaited.
+        queue: asyncio.Queue[Any] = asyncio.Queue(2 * self._session.window.limit)
+        self._started = time.perf_counter()
+        producer = asyncio.get_running_loop().create_task(self._produce(queue))
+        try:
+            while (item := await queue.get()) is not _DONE:
+                if isinstance(item, Exception):
+                    raise item
+                response: CommandResponse = await item
+                self._stats.completed += 1
+                if not response.ok:
+                    self._stats.failed += 1
+                yield response
+        finally:
+            producer.cancel()
+            # commands whose responses are not awaited anymore give up their
+            # slot of the window
+            while not queue.empty():
+                item = queue.get_nowait()
+                if isinstance(item, asyncio.Future):
+                    item.cancel()
+            self._stopped = time.perf_counter()
+
+    async def results(self) -> list[CommandResponse]:
+        """Returns the responses of all commands in the order of the commands."""
+        return [response async for response in self]
+
+    async def drain(self) -> BatchStats:
+        """Runs all commands, discards their responses and returns the
+        statistics of the batch."""
+        async for _ in self:
+            pass
+        return self.stats
+
+    def __await__(self) -> Generator[Any, None, list[CommandResponse]]:
+        return self.results().__await__()
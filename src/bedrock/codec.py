@@ -0,0 +1,151 @@
+"""
+This module contains the JSON codecs used to decode the messages received
+from a client and to encode the messages sent to it.
+
+The fastest codec available is used by default. Install the ``fast`` extra
+(``pip install bedrockpy[fast]``) to make use of
+`orjson <https://pypi.org/project/orjson/>`_. If neither orjson nor
+`msgspec <https://pypi.org/project/msgspec/>`_ is installed, the standard
+library's :external+python:mod:`json` module is used.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Mapping
+import json
+from typing import Any
+
+from attrs import define
+
+
+@define(frozen=True)
+class Codec:
+    """A JSON codec.
+
+    Attributes
+    ----------
+    name
+        The name of the codec.
+
+    loads
+        Decodes a message. The message may be :external+python:class:`str` or
+        :external+python:class:`bytes` so that binary frames do not need to be
+        decoded as text first.
+
+    dumps
+        Encodes a message. The message is returned as
+        :external+python:class:`str` as the client only understands text
+        frames.
+    """
+
+    name: str
+    loads: Callable[[str | bytes], Any]
+    dumps: Callable[[Any], str]
+
+    def peek_header(self, message: str | bytes) -> Mapping[str, Any] | None:
+        """Decodes only the header of a message.
+
+        The header of a message is a flat object which is much smaller than
+        the body of most game events. Peeking at it is enough to decide
+        whether the body needs to be decoded at all.
+
+        Parameters
+        ----------
+        message
+            The message as received from the client.
+
+        Returns
+        -------
+        The header or ``None`` if it cannot be located without decoding the
+        whole message, in which case the message should be decoded with
+        :attr:`loads`.
+        """
+        tokens: Any = _TOKENS if isinstance(message, str) else _TOKENS_BYTES
+        key, opening, closing = tokens
+        # A key cannot appear inside a JSON string as its quotes would be
+        # escaped. It may still be the key of a nested object of the body,
+        # so the header is only located if the key occurs exactly once.
+        start = message.find(key)
+        if start == -1 or message.find(key, start + 1) != -1:
+            return None
+        start = message.find(opening, start + len(key))
+        end = message.find(closing, start) + 1
+        if start == -1 or end == 0 or message.find(opening, start + 1, end) != -1:
+            # the header is not a flat object
+            return None
+        header = self.loads(message[start:end])
+        return header if isinstance(header, dict) else None
+
+_TOKENS = ('"header":', "{", "}")
+_TOKENS_BYTES = tuple(token.encode() for token in _TOKENS)
+
+
+def _json() -> Codec:
+    return Codec("json", json.loads, json.dumps)
+
+
+def _orjson() -> Codec:
+    import orjson
+
+    dumps = orjson.dumps
+
+    def encode(obj: Any) -> str:
+        return dumps(obj).decode()
+
+    return Codec("orjson", orjson.loads, encode)
+
+
+def _msgspec() -> Codec:
+    import msgspec  # type: ignore
+
+    decoder = msgspec.json.Decoder()
+    encoder = msgspec.json.Encoder()
+
+    def encode(obj: Any) -> str:
+        text: str = encoder.encode(obj).decode()
+        return text
+
+    return Codec("msgspec", decoder.decode, encode)
+
+
+_CODECS: dict[str, Callable[[], Codec]] = {
+    "orjson": _orjson,
+    "msgspec": _msgspec,
+    "json": _json,
+}
+
+
+def get_codec(name: str | None = None) -> Codec:
+    """Returns a codec.
+
+    Parameters
+    ----------
+    name
+        The name of the codec: ``'orjson'``, ``'msgspec'`` or ``'json'``. If
+        omitted, the first codec that is installed in this order is returned.
+
+    Raises
+    ------
+    ValueError
+        There is no codec with the given name.
+
+    ImportError
+        The package required by the codec is not installed.
+    """
+    if name is not None:
+        try:
+            factory = _CODECS[name]
+        except KeyError:
+            raise ValueError(f"unknown codec {name!r}") from None
+        return factory()
+
+    for factory in _CODECS.values():
+        try:
+            return factory()
+        except ImportError:
+            pass
+    raise AssertionError("unreachable")
+
+
+default = get_codec()
+"""The codec used when no other codec is specified."""
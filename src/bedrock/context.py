@@ -2,16 +2,21 @@ from __future__ import annotations
 
 from abc import ABCMeta
 from collections.abc import Mapping
-from typing import TYPE_CHECKING, Any, Literal, overload
+from typing import TYPE_CHECKING, Any, ClassVar, Literal, overload
 
-from attrs import define
+from attrs import define, field
+import convert_case
 
+from . import consts
 from .response import CommandResponse
+from .schema import SCHEMAS, EventSchema
 
 if TYPE_CHECKING:
     from .server import Server
+    from .session import Session
 
-from .utils import WorldCoordinate, WorldCoordinates, rawtext
+from .utils import Vector, WorldCoordinate, WorldCoordinates, rawtext
+from .window import Lane
 
 
 @define
@@ -19,28 +24,85 @@ class Context(metaclass=ABCMeta):
     """Context passed to event handlers."""
 
     _server: Server
+    _session: Session | None = field(default=None, kw_only=True)
 
     @property
     def server(self) -> Server:
         """A reference to the server object this context belongs to."""
         return self._server
 
+    @property
+    def session(self) -> Session | None:
+        """The session of the client this context originates from.
+
+        This is ``None`` for contexts that do not belong to a specific client
+        such as :class:`ReadyContext`.
+        """
+        return self._session
+
 
 @define
 class GameContext(Context, metaclass=ABCMeta):
-    """Context passed to game event handlers."""
+    """Context passed to game event handlers.
+
+    Fields are extracted from the raw data of the event only when they are
+    accessed. Fields which are expensive to extract are cached.
+
+    Attributes
+    ----------
+    schema
+        The schema of the game event or ``None`` if the game event is unknown.
+    """
+
+    schema: ClassVar[EventSchema | None] = None
 
     _server: Server
     _data: Mapping[str, Any]
+    _position: Vector | None = field(init=False, default=None, repr=False, eq=False)
+    _record: Any = field(init=False, default=None, repr=False, eq=False)
 
     @property
     def data(self) -> Mapping[str, Any]:
         """A reference to the raw data of the event received."""
         return self._data
 
+    @property
+    def record(self) -> Any:
+        """The fields of the event decoded into a record as declared by
+        :attr:`schema`.
+
+        The record is decoded on first access. Fields missing from the event
+        are ``None``.
+
+        Raises
+        ------
+        TypeError
+            The game event has no schema.
+        """
+        if self._record is None:
+            if self.schema is None:
+                raise TypeError(f"{type(self).__name__} has no schema")
+            self._record = self.schema.decode(self._data)
+        return self._record
+
+    def _player_position(self) -> Vector:
+        if self._position is None:
+            xyz = self._data["player"]["position"]
+            self._position = Vector(xyz["x"], xyz["y"], xyz["z"])
+        return self._position
+
+
+def _world_coordinates(position: Vector) -> WorldCoordinates:
+    x, y, z = position
+    return WorldCoordinates(
+        (WorldCoordinate(x), WorldCoordinate(y), WorldCoordinate(z))
+    )
+
 
 @define
 class BlockBrokenContext(GameContext):
+    schema = SCHEMAS["block_broken"]
+
     @property
     def id(self) -> str:
         value = self._data["block"]["id"]
@@ -83,6 +145,8 @@ class BlockBrokenContext(GameContext):
 
 @define
 class BlockPlacedContext(GameContext):
+    schema = SCHEMAS["block_placed"]
+
     @property
     def id(self) -> str:
         value = self._data["block"]["id"]
@@ -107,16 +171,14 @@ class BlockPlacedContext(GameContext):
         assert isinstance(value, str)
         return value
 
+    @property
+    def position(self) -> Vector:
+        """The position of the player."""
+        return self._player_position()
+
     @property
     def player_position(self) -> WorldCoordinates:
-        xyz = self._data["player"]["position"]
-        return WorldCoordinates(
-            (
-                WorldCoordinate(xyz["x"]),
-                WorldCoordinate(xyz["y"]),
-                WorldCoordinate(xyz["z"]),
-            )
-        )
+        return _world_coordinates(self._player_position())
 
     @property
     def tool(self) -> str | None:
@@ -130,20 +192,22 @@ class BlockPlacedContext(GameContext):
 
 @define
 class EndOfDayContext(GameContext):
+    schema = SCHEMAS["end_of_day"]
+
+    @property
+    def position(self) -> Vector:
+        """The position of the player."""
+        return self._player_position()
+
     @property
     def player_position(self) -> WorldCoordinates:
-        xyz = self._data["player"]["position"]
-        return WorldCoordinates(
-            (
-                WorldCoordinate(xyz["x"]),
-                WorldCoordinate(xyz["y"]),
-                WorldCoordinate(xyz["z"]),
-            )
-        )
+        return _world_coordinates(self._player_position())
 
 
 @define
 class PlayerMessageContext(GameContext):
+    schema = SCHEMAS["player_message"]
+
     @property
     def message(self) -> str:
         """The message."""
@@ -192,31 +256,36 @@ class PlayerMessageContext(GameContext):
             command = f"tellraw {self.sender} {rawtext(message)}"
         else:
             command = f"tell {self.sender} {message}"
-        return await self.server.run(command, wait=wait)  # type: ignore
+        target = self.session if self.session is not None else self.server
+        return await target.run(  # type: ignore
+            command, wait=wait, priority=Lane.INTERACTIVE
+        )
 
 
 @define
 class PlayerTransformContext(GameContext):
+    schema = SCHEMAS["player_transform"]
+
     @property
     def player(self) -> str:
         value = self._data["player"]["name"]
         assert isinstance(value, str)
         return value
 
+    @property
+    def position(self) -> Vector:
+        """The position of the player."""
+        return self._player_position()
+
     @property
     def player_position(self) -> WorldCoordinates:
-        xyz = self._data["player"]["position"]
-        return WorldCoordinates(
-            (
-                WorldCoordinate(xyz["x"]),
-                WorldCoordinate(xyz["y"]),
-                WorldCoordinate(xyz["z"]),
-            )
-        )
+        return _world_coordinates(self._player_position())
 
 
 @define
 class PlayerTravelledContext(GameContext):
+    schema = SCHEMAS["player_travelled"]
+
     @property
     def underwater(self) -> bool:
         value = self._data["isUnderwater"]
@@ -235,16 +304,14 @@ class PlayerTravelledContext(GameContext):
         assert isinstance(value, str)
         return value
 
+    @property
+    def position(self) -> Vector:
+        """The position of the player."""
+        return self._player_position()
+
     @property
     def player_position(self) -> WorldCoordinates:
-        xyz = self._data["player"]["position"]
-        return WorldCoordinates(
-            (
-                WorldCoordinate(xyz["x"]),
-                WorldCoordinate(xyz["y"]),
-                WorldCoordinate(xyz["z"]),
-            )
-        )
+        return _world_coordinates(self._player_position())
 
     @property
     def travel_method(self) -> int:
@@ -259,91 +326,46 @@ class ServerContext(Context, metaclass=ABCMeta):
 
 
 def get_game_context(name: str) -> type[GameContext]:
-    return {
-        # TODO: implementation of the commented events
-        # "additional_content_loaded": AdditionalContentLoadedContext,
-        # "agent_command": AgentCommandContext,
-        # "api_init": ApiInitContext,
-        # "app_paused": AppPausedContext,
-        # "app_resumed": AppResumedContext,
-        # "app_suspended": AppSuspendedContext,
-        # "award_achievement": AwardAchievementContext,
-        "block_broken": BlockBrokenContext,
-        "block_placed": BlockPlacedContext,
-        # "board_text_updated": BoardTextUpdatedContext,
-        # "boss_killed": BossKilledContext,
-        # "camera_used": CameraUsedContext,
-        # "cauldron_used": CauldronUsedContext,
-        # "configuration_changed": ConfigurationChangedContext,
-        # "connection_failed": ConnectionFailedEvent,
-        # "crafting_session_completed": CraftingSessionCompletedContext,
-        "end_of_day": EndOfDayContext,
-        # "entity_spawned": EntitySpawnedContext,
-        # "file_transmission_cancelled": FileTransmissionCancelledContext,
-        # "file_transmission_completed": FileTransmissionCompletedContext,
-        # "file_transmission_started": FileTransmissionStartedContext,
-        # "first_time_client_open": FirstTimeClientOpenContext,
-        # "focus_gained": FocusGainedContext,
-        # "focus_lost": FocusLostContext,
-        # "game_session_complete": GameSessionCompleteContext,
-        # "game_session_start": GameSessionStartContext,
-        # "hardware_info": HardwareInfoContext,
-        # "has_new_content": HasNewContentContext,
-        # "item_acquired": ItemAcquiredContext,
-        # "item_crafted": ItemCraftedContext,
-        # "item_destroyed": ItemDestroyedContext,
-        # "item_dropped": ItemDroppedContext,
-        # "item_enchanted": ItemEnchantedContext,
-        # "item_smelted": ItemSmeltedContext,
-        # "item_used": ItemUsedContext,
-        # "join_canceled": JoinCanceledContext,
-        # "jukebox_used": JukeboxUsedContext,
-        # "license_census": LicenseCensusContext,
-        # "mascot_created": MascotCreatedContext,
-        # "menu_shown": MenuShownContext,
-        # "mob_interacted": MobInteractedContext,
-        # "mob_killed": MobKilledContext,
-        # "multiplayer_connection_state_changed": MultiplayerConnectionStateChangedContext,
-        # "multiplayer_round_end": MultiplayerRoundEndContext,
-        # "multiplayer_round_start": MultiplayerRoundStartContext,
-        # "npc_properties_updated": NpcPropertiesUpdatedContext,
-        # "options_updated": OptionsUpdatedContext,
-        # "performance_metrics": PerformanceMetricsContext,
-        # "player_bounced": PlayerBouncedContext,
-        # "player_died": PlayerDiedContext,
-        # "player_join": PlayerJoinContext,
-        # "player_leave": PlayerLeaveContext,
-        "player_message": PlayerMessageContext,
-        # "player_teleported": PlayerTeleportedContext,
-        "player_transform": PlayerTransformContext,
-        "player_travelled": PlayerTravelledContext,
-        # "portal_built": PortalBuiltContext,
-        # "portal_used": PortalUsedContext,
-        # "portfolio_exported": PortfolioExportedContext,
-        # "potion_brewed": PotionBrewedContext,
-        # "purchase_attempt": PurchaseAttemptContext,
-        # "purchase_resolved": PurchaseResolvedContext,
-        # "regional_popup": RegionalPopupContext,
-        # "responded_to_accept_content": RespondedToAcceptContentContext,
-        # "screen_changed": ScreenChangedContext,
-        # "screen_heartbeat": ScreenHeartbeatContext,
-        # "sign_in_to_edu": SignInToEduContext,
-        # "sign_in_to_xbox_live": SignInToXboxLiveContext,
-        # "sign_out_of_xbox_live": SignOutOfXboxLiveContext,
-        # "special_mob_built": SpecialMobBuiltContext,
-        # "start_client": StartClientContext,
-        # "start_world": StartWorldContext,
-        # "text_to_speech_toggled": TextToSpeechToggledContext,
-        # "ugc_download_completed": UgcDownloadCompletedContext,
-        # "ugc_download_started": UgcDownloadStartedContext,
-        # "upload_skin": UploadSkinContext,
-        # "vehicle_exited": VehicleExitedContext,
-        # "world_exported": WorldExportedContext,
-        # "world_files_listed": WorldFilesListedContext,
-        # "world_generated": WorldGeneratedContext,
-        # "world_loaded": WorldLoadedContext,
-        # "world_unloaded": WorldUnloadedContext,
-    }[name]
+    """Returns the context type of a game event.
+
+    Raises
+    ------
+    KeyError
+        There is no specific context type for the game event.
+    """
+    return GAME_CONTEXTS[name]
+
+
+def _generate_context(schema: EventSchema) -> type[GameContext]:
+    return type(
+        f"{convert_case.pascal_case(schema.name)}Context",
+        (GameContext,),
+        {
+            "__slots__": (),
+            "__module__": __name__,
+            "__doc__": f"Context of the ``{schema.name}`` game event. Its fields "
+            "are available through :attr:`GameContext.record`.",
+            "schema": schema,
+        },
+    )
+
+
+GAME_CONTEXTS: dict[str, type[GameContext]] = {
+    "block_broken": BlockBrokenContext,
+    "block_placed": BlockPlacedContext,
+    "end_of_day": EndOfDayContext,
+    "player_message": PlayerMessageContext,
+    "player_transform": PlayerTransformContext,
+    "player_travelled": PlayerTravelledContext,
+}
+"""Maps the names of game events to their context type."""
+
+# every other game event gets a context generated from its schema
+GAME_CONTEXTS.update(
+    (name, _generate_context(SCHEMAS[name]))
+    for name in consts.GAME_EVENTS
+    if name not in GAME_CONTEXTS
+)
 
 
 @define
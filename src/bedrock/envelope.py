@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import json
+from json.encoder import encode_basestring_ascii
+from typing import Any
+
+from attrs import define
+
+from . import consts
+
+_REQUEST_ID = "\x00requestId\x00"
+_COMMAND_LINE = "\x00commandLine\x00"
+
+
+@define(frozen=True)
+class CommandEnvelope:
+    """A pre-serialized ``commandRequest`` frame.
+
+    Only the request id and the command line differ between two command
+    requests using the same Minecraft version and origin. An envelope keeps
+    the serialized JSON around them so that a frame is built by splicing in
+    the escaped request id and command line instead of serializing the whole
+    request. The frames are identical to what :external+python:func:`json.dumps`
+    produces for the same request.
+
+    Use :func:`get_envelope` to get a cached envelope.
+    """
+
+    _prefix: str
+    _middle: str
+    _suffix: str
+
+    @classmethod
+    def compile(
+        cls, version: str | list[str] | None = None, origin: str = "player"
+    ) -> CommandEnvelope:
+        """Compiles an envelope.
+
+        Parameters
+        ----------
+        version
+            The Minecraft version the command syntax relies on. Defaults to
+            :data:`bedrock.consts.MINECRAFT_VERSION`.
+
+        origin
+            The type of the origin the command is executed by.
+        """
+        text = json.dumps(
+            {
+                "header": {
+                    "messageType": "commandRequest",
+                    "messagePurpose": "commandRequest",
+                    "version": 1,
+                    "requestId": _REQUEST_ID,
+                },
+                "body": {
+                    "version": version or consts.MINECRAFT_VERSION,
+                    "commandLine": _COMMAND_LINE,
+                    "origin": {"type": origin},
+                },
+            }
+        )
+        prefix, rest = text.split(encode_basestring_ascii(_REQUEST_ID))
+        middle, suffix = rest.split(encode_basestring_ascii(_COMMAND_LINE))
+        return cls(prefix, middle, suffix)
+
+    def render(self, request_id: str, command: str) -> str:
+        """Returns the frame of a command request.
+
+        Parameters
+        ----------
+        request_id
+            The unique id of the request.
+
+        command
+            The command to execute without a leading slash.
+        """
+        return (
+            self._prefix
+            + encode_basestring_ascii(request_id)
+            + self._middle
+            + encode_basestring_ascii(command)
+            + self._suffix
+        )
+
+
+_envelopes: dict[tuple[Any, str], CommandEnvelope] = {}
+
+
+def get_envelope(
+    version: str | list[str] | None = None, origin: str = "player"
+) -> CommandEnvelope:
+    """Returns a cached :class:`CommandEnvelope` for the given Minecraft version
+    and origin, compiling it on first use.
+
+    Parameters
+    ----------
+    version
+        The Minecraft version the command syntax relies on. Defaults to
+        :data:`bedrock.consts.MINECRAFT_VERSION`.
+
+    origin
+        The type of the origin the command is executed by.
+    """
+    version = version or consts.MINECRAFT_VERSION
+    key = (version if isinstance(version, str) else tuple(version), origin)
+    try:
+        return _envelopes[key]
+    except KeyError:
+        envelope = _envelopes[key] = CommandEnvelope.compile(version, origin)
+        return envelope
@@ -1,12 +1,15 @@
-from collections.abc import Callable, Coroutine
+from collections.abc import Callable, Coroutine, Mapping
 from typing import Any, Generic, TypeVar
 
 from attrs import define
 
 from .context import Context, GameContext, ServerContext
+from .throttle import Throttle
+from .window import Source, set_source
 
 ContextType = TypeVar("ContextType", bound=Context)
 EventHandler = Callable[[ContextType], Coroutine[Any, Any, None]]
+RawEventHandler = Callable[[Mapping[str, Any]], Coroutine[Any, Any, None]]
 
 
 @define
@@ -15,12 +18,21 @@ class Event(Generic[ContextType]):
     handler: EventHandler[ContextType]
 
     async def __call__(self, ctx: ContextType, /) -> None:
+        set_source(Source(self.name))
         return await self.handler(ctx)
 
 
 @define
 class GameEvent(Event[GameContext]):
-    pass
+    throttle: Throttle[Mapping[str, Any]] | None = None
+    raw: bool = False
+    """The handler is called with the raw data of the event (a
+    :class:`RawEventHandler`) instead of a context."""
+
+    async def call_raw(self, data: Mapping[str, Any], /) -> None:
+        """Calls the handler with the raw data of the event."""
+        set_source(Source(self.name))
+        return await self.handler(data)  # type: ignore[arg-type]
 
 
 @define
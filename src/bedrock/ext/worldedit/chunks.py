@@ -0,0 +1,373 @@
+"""
+This module places large structures chunk by chunk.
+
+Commands modifying blocks in chunks that are not loaded fail. A player only
+keeps the chunks around them loaded, so large structures are usually only
+partially placed. This module sorts the boxes of a structure along a
+Z-order curve over the chunks they start in so that consecutive commands
+modify nearby chunks. The sorted boxes are divided into fronts whose chunks
+fit into one ticking area. A ticking area keeps its chunks loaded while the
+commands of its front run and is removed afterwards. The ticking areas of the
+next fronts are added ahead of time so that their chunks are loaded by the
+time they are needed.
+
+Boxes spanning more chunks than fit into a ticking area are split along chunk
+borders. Commands that fail because their chunks are not loaded nonetheless
+are run once more at the end of their front and counted in the
+:class:`BuildReport`. The ticking areas are removed even if placing the
+structure fails.
+
+
+Example
+=======
+
+.. code-block:: python
+
+    from bedrock.ext.worldedit import chunks
+
+    report = await chunks.place(ctx.server, terrain, palette, (-2048, 0, -2048))
+    print(f"{report.unloaded} commands hit unloaded chunks")
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+import logging
+import math
+from typing import Any
+
+from attrs import define, field
+import numpy as np
+
+from ...batch import BatchStats
+from ...response import CommandResponse
+from . import Origin, Target, _add, commands, mesh
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 16
+"""The size of a chunk along the ``x`` and ``z`` axis."""
+
+MAX_TICKING_AREA_CHUNKS = 100
+"""The maximum amount of chunks of a ticking area."""
+
+MAX_TICKING_AREAS = 10
+"""The maximum amount of ticking areas of a world."""
+
+
+def is_unloaded(response: CommandResponse) -> bool:
+    """Returns ``True`` if a command failed because it modified blocks in a
+    chunk that is not loaded."""
+    if response.ok:
+        return False
+    message = (response.message or "").lower()
+    return "outside of the world" in message or "unloaded" in message
+
+
+@define
+class BuildReport:
+    """The progress of placing a structure with :func:`place`."""
+
+    commands: int = 0
+    """The amount of commands placing blocks."""
+
+    failed: int = 0
+    """The amount of commands that failed, including those that still failed
+    after being retried and those placing ticking areas."""
+
+    unloaded: int = 0
+    """The amount of times a command failed because of unloaded chunks."""
+
+    retried: int = 0
+    """The amount of commands run once more."""
+
+    fronts: int = 0
+    """The amount of fronts the structure was divided into."""
+
+    stats: BatchStats = field(factory=BatchStats)
+    """The statistics of all commands sent, including ticking areas."""
+
+
+def _spread(value: np.ndarray) -> np.ndarray:
+    """Inserts a zero bit after each of the lower 32 bits."""
+    v = value.astype(np.uint64) & np.uint64(0xFFFFFFFF)
+    for shift, mask in (
+        (16, 0x0000FFFF0000FFFF),
+        (8, 0x00FF00FF00FF00FF),
+        (4, 0x0F0F0F0F0F0F0F0F),
+        (2, 0x3333333333333333),
+        (1, 0x5555555555555555),
+    ):
+        v = (v | (v << np.uint64(shift))) & np.uint64(mask)
+    return v
+
+
+def chunk_order(boxes: np.ndarray, origin: Origin = (0, 0, 0)) -> np.ndarray:
+    """Returns the order of boxes along a Z-order curve over chunks.
+
+    Parameters
+    ----------
+    boxes
+        The boxes as returned by :func:`bedrock.ext.worldedit.mesh`.
+
+    origin
+        The world coordinates of the block at index ``[0, 0, 0]``.
+
+    Returns
+    -------
+    numpy.ndarray
+        The indices of ``boxes`` sorted by the chunk each box starts in.
+        Boxes starting in the same chunk keep their order.
+    """
+    cx = (boxes[:, 0] + origin[0]) // CHUNK_SIZE
+    cz = (boxes[:, 2] + origin[2]) // CHUNK_SIZE
+    if len(boxes):
+        cx = cx - cx.min()
+        cz = cz - cz.min()
+    keys = _spread(cx) | (_spread(cz) << np.uint64(1))
+    return np.argsort(keys, kind="stable")
+
+
+def fronts(
+    boxes: np.ndarray,
+    origin: Origin = (0, 0, 0),
+    *,
+    max_chunks: int = MAX_TICKING_AREA_CHUNKS,
+) -> list[np.ndarray]:
+    """Divides boxes into fronts whose chunks fit into a ticking area.
+
+    Parameters
+    ----------
+    boxes
+        The boxes as returned by :func:`bedrock.ext.worldedit.mesh`.
+
+    origin
+        The world coordinates of the block at index ``[0, 0, 0]``.
+
+    max_chunks
+        The maximum amount of chunks of the bounding rectangle of a front.
+        A box covering more chunks forms a front on its own.
+
+    Returns
+    -------
+    list[numpy.ndarray]
+        The indices of the boxes of each front in the order of
+        :func:`chunk_order`.
+    """
+    order = chunk_order(boxes, origin)
+    x0 = (boxes[:, 0] + origin[0]) // CHUNK_SIZE
+    z0 = (boxes[:, 2] + origin[2]) // CHUNK_SIZE
+    x1 = (boxes[:, 0] + boxes[:, 3] - 1 + origin[0]) // CHUNK_SIZE
+    z1 = (boxes[:, 2] + boxes[:, 5] - 1 + origin[2]) // CHUNK_SIZE
+
+    result = []
+    start = 0
+    bounds: tuple[int, int, int, int] | None = None
+    rectangles = np.stack((x0, z0, x1, z1), axis=1)[order].tolist()
+    for i, (a, b, c, d) in enumerate(rectangles):
+        if bounds is not None:
+            grown = (
+                min(bounds[0], a),
+                min(bounds[1], b),
+                max(bounds[2], c),
+                max(bounds[3], d),
+            )
+            if (grown[2] - grown[0] + 1) * (grown[3] - grown[1] + 1) <= max_chunks:
+                bounds = grown
+                continue
+            result.append(order[start:i])
+        start = i
+        bounds = (a, b, c, d)
+    if bounds is not None:
+        result.append(order[start:])
+    return result
+
+
+def _split_axis(boxes: np.ndarray, origin: int, axis: int, cell: int) -> np.ndarray:
+    start = boxes[:, axis] + origin
+    end = start + boxes[:, axis + 3] - 1
+    first = start // cell
+    pieces = end // cell - first + 1
+    if (pieces == 1).all():
+        return boxes
+    rows = np.repeat(np.arange(len(boxes)), pieces)
+    # the index of each piece within its box
+    index = np.arange(len(rows)) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+    lower = np.maximum(start[rows], (first[rows] + index) * cell)
+    upper = np.minimum(end[rows], (first[rows] + index + 1) * cell - 1)
+    result = boxes[rows]
+    result[:, axis] = lower - origin
+    result[:, axis + 3] = upper - lower + 1
+    return result
+
+
+def split(
+    boxes: np.ndarray,
+    origin: Origin = (0, 0, 0),
+    *,
+    max_chunks: int = MAX_TICKING_AREA_CHUNKS,
+) -> np.ndarray:
+    """Splits boxes along chunk borders so that each of them fits into a
+    ticking area.
+
+    Parameters
+    ----------
+    boxes
+        The boxes as returned by :func:`bedrock.ext.worldedit.mesh`.
+
+    origin
+        The world coordinates of the block at index ``[0, 0, 0]``.
+
+    max_chunks
+        The maximum amount of chunks a box may cover.
+
+    Returns
+    -------
+    numpy.ndarray
+        The boxes, where boxes covering more than ``max_chunks`` chunks are
+        replaced by pieces covering a square of at most ``max_chunks``
+        chunks.
+
+    Raises
+    ------
+    ValueError
+        ``max_chunks`` is less than one.
+    """
+    if max_chunks < 1:
+        raise ValueError("max_chunks must be at least 1")
+    x0 = (boxes[:, 0] + origin[0]) // CHUNK_SIZE
+    z0 = (boxes[:, 2] + origin[2]) // CHUNK_SIZE
+    x1 = (boxes[:, 0] + boxes[:, 3] - 1 + origin[0]) // CHUNK_SIZE
+    z1 = (boxes[:, 2] + boxes[:, 5] - 1 + origin[2]) // CHUNK_SIZE
+    large = (x1 - x0 + 1) * (z1 - z0 + 1) > max_chunks
+    if not large.any():
+        return boxes
+    cell = math.isqrt(max_chunks) * CHUNK_SIZE
+    pieces = _split_axis(boxes[large], origin[0], 0, cell)
+    pieces = _split_axis(pieces, origin[2], 2, cell)
+    return np.concatenate((boxes[~large], pieces))
+
+
+def _ticking_area(boxes: np.ndarray, origin: Origin, name: str) -> str:
+    ox, oy, oz = origin
+    lower = boxes[:, :3].min(axis=0)
+    upper = (boxes[:, :3] + boxes[:, 3:6] - 1).max(axis=0)
+    return (
+        f"tickingarea add {lower[0] + ox} {lower[1] + oy} {lower[2] + oz}"
+        f" {upper[0] + ox} {upper[1] + oy} {upper[2] + oz} {name} true"
+    )
+
+
+async def place(
+    target: Target,
+    blocks: np.ndarray,
+    palette: Sequence[str],
+    origin: Origin = (0, 0, 0),
+    *,
+    skip: int | None = None,
+    max_chunks: int = MAX_TICKING_AREA_CHUNKS,
+    preload: int = 1,
+    name: str = "bedrockpy",
+    **kwargs: Any,
+) -> BuildReport:
+    """Places an array of blocks in the world front by front.
+
+    Parameters
+    ----------
+    target
+        The server or session to run the commands with.
+
+    blocks
+        A three-dimensional array of indices into ``palette``.
+
+    palette
+        The blocks referred to by ``blocks``.
+
+    origin
+        The world coordinates of the block at index ``[0, 0, 0]``.
+
+    skip
+        A value of ``blocks`` marking blocks to leave untouched.
+
+    max_chunks
+        The maximum amount of chunks of a front. Larger boxes are split (see
+        :func:`split`).
+
+    preload
+        The amount of fronts whose ticking areas are added ahead of the
+        front being placed.
+
+    name
+        The prefix of the names of the ticking areas.
+
+    **kwargs
+        Passed on to :meth:`bedrock.session.Session.run_many`.
+
+    Returns
+    -------
+    BuildReport
+        The progress of the build.
+
+    Raises
+    ------
+    ValueError
+        More ticking areas would be needed at once than a world supports or
+        ``max_chunks`` is less than one.
+    """
+    if not 0 <= preload < MAX_TICKING_AREAS:
+        raise ValueError(f"preload must be between 0 and {MAX_TICKING_AREAS - 1}")
+    boxes = split(mesh(blocks, skip=skip), origin, max_chunks=max_chunks)
+    groups = fronts(boxes, origin, max_chunks=max_chunks)
+    report = BuildReport(commands=len(boxes), fronts=len(groups))
+
+    async def run(lines: list[str]) -> list[str]:
+        """Runs commands and returns those that failed due to unloaded chunks.
+
+        Other failures are counted right away.
+        """
+        batch = target.run_many(lines, **kwargs)
+        unloaded = []
+        i = 0
+        async for response in batch:
+            if is_unloaded(response):
+                report.unloaded += 1
+                unloaded.append(lines[i])
+            elif not response.ok:
+                report.failed += 1
+            i += 1
+        _add(report.stats, batch.stats)
+        return unloaded
+
+    # the ticking areas that may have been added and not removed yet
+    added: list[int] = []
+
+    def area(i: int) -> str:
+        added.append(i)
+        return _ticking_area(boxes[groups[i]], origin, f"{name}{i}")
+
+    try:
+        await run([area(i) for i in range(min(preload + 1, len(groups)))])
+        for i, group in enumerate(groups):
+            retry = await run(list(commands(boxes[group], palette, origin)))
+            if retry:
+                report.retried += len(retry)
+                report.failed += len(await run(retry))
+            following = i + preload + 1
+            await run(
+                [f"tickingarea remove {name}{i}"]
+                + ([area(following)] if following < len(groups) else [])
+            )
+            added.remove(i)
+    finally:
+        if added:
+            # Ticking areas outlive the connection and would collide with
+            # those of the next build.
+            try:
+                await target.run_many(
+                    [f"tickingarea remove {name}{i}" for i in added], **kwargs
+                ).drain()
+            except Exception:
+                logger.warning(
+                    "failed to remove ticking areas %s", added, exc_info=True
+                )
+    return report
@@ -0,0 +1,320 @@
+"""
+This module places structures with many repeated parts by copying them.
+
+The structure is divided into tiles of a fixed size. Tiles with the same
+content are grouped. The first tile of a group is placed with ``fill``
+commands as usual. Other tiles of the group are copied from it with a single
+``clone`` command each if that saves commands, that is if the tile holds
+more boxes of :func:`bedrock.ext.worldedit.mesh` than a copy would cut.
+Neighbouring copies of neighbouring tiles are merged into one ``clone``
+command. For repetitive structures like rows of houses this needs a fraction
+of the commands. Structures that are not repetitive in a way copies can take
+advantage of are placed with the boxes of
+:func:`bedrock.ext.worldedit.mesh` alone.
+
+
+Example
+=======
+
+.. code-block:: python
+
+    from bedrock.ext.worldedit import dedupe
+
+    report = await dedupe.place(ctx.server, city, palette, (0, 64, 0))
+    print(f"saved {report.saved} of {report.baseline} commands")
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterator, Sequence
+from typing import Any
+
+from attrs import define, field
+import numpy as np
+
+from ...batch import BatchStats
+from . import MAX_FILL_VOLUME, Origin, Target, _add, _group, commands, mesh
+
+_CLONED = -1
+
+
+@define
+class DeduplicationReport:
+    """The savings of placing a structure with :func:`place`."""
+
+    tiles: int = 0
+    """The amount of tiles the structure was divided into."""
+
+    cloned_tiles: int = 0
+    """The amount of tiles copied from another tile."""
+
+    commands: int = 0
+    """The amount of commands needed with deduplication."""
+
+    baseline: int = 0
+    """The amount of commands needed without deduplication."""
+
+    skipped: int = 0
+    """The amount of ``clone`` commands left out because placing their source
+    failed."""
+
+    stats: BatchStats = field(factory=BatchStats)
+    """The statistics of the commands sent."""
+
+    @property
+    def saved(self) -> int:
+        """The amount of commands saved by deduplication."""
+        return self.baseline - self.commands
+
+
+def _tile_boxes(
+    boxes: np.ndarray, tile: tuple[int, int, int], counts: tuple[int, int, int]
+) -> tuple[np.ndarray, np.ndarray]:
+    """Returns the amount of boxes within each tile and the amount of boxes
+    overlapping each tile."""
+    size = np.array(tile)
+    lower = boxes[:, :3] // size
+    upper = (boxes[:, :3] + boxes[:, 3:6] - 1) // size
+    valid = (lower < np.array(counts)).all(axis=1)
+    inside = valid & (lower == upper).all(axis=1)
+    lower = lower[valid]
+    upper = np.minimum(upper[valid], np.array(counts) - 1)
+    spans = upper - lower + 1
+
+    # one row per overlapped tile of each box
+    totals = spans.prod(axis=1)
+    rows = np.repeat(np.arange(len(spans)), totals)
+    index = np.arange(len(rows)) - np.repeat(np.cumsum(totals) - totals, totals)
+    index, z = np.divmod(index, spans[rows, 2])
+    x, y = np.divmod(index, spans[rows, 1])
+    x, y, z = x + lower[rows, 0], y + lower[rows, 1], z + lower[rows, 2]
+    _, ny, nz = counts
+    overlapping = (x * ny + y) * nz + z
+    corners = boxes[inside, :3] // size
+    within = (corners[:, 0] * ny + corners[:, 1]) * nz + corners[:, 2]
+    n = counts[0] * ny * nz
+    return np.bincount(within, minlength=n), np.bincount(overlapping, minlength=n)
+
+
+def _deduplicate(
+    blocks: np.ndarray,
+    tile: tuple[int, int, int],
+    skip: int | None,
+    max_volume: int,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    tx, ty, tz = tile
+    if tx * ty * tz > max_volume:
+        raise ValueError(f"tiles of {tx * ty * tz} blocks exceed {max_volume}")
+    nx, ny, nz = (size // t for size, t in zip(blocks.shape, tile))
+    baseline = mesh(blocks, skip=skip, max_volume=max_volume)
+
+    # One row per tile holding its blocks. Identical rows are grouped by
+    # sorting their raw bytes which compares the tiles as a whole.
+    core = blocks[: nx * tx, : ny * ty, : nz * tz]
+    tiles = np.ascontiguousarray(
+        core.reshape(nx, tx, ny, ty, nz, tz)
+        .transpose(0, 2, 4, 1, 3, 5)
+        .reshape(nx * ny * nz, tx * ty * tz)
+    )
+    rows = tiles.view(np.dtype((np.void, tiles.dtype.itemsize * tiles.shape[1])))
+    _, first, inverse = np.unique(rows.ravel(), return_index=True, return_inverse=True)
+    sources = first[inverse.ravel()]
+
+    # A copy replaces the boxes within its tile but cuts the boxes reaching
+    # into it from outside, each into at most one more box.
+    inside, overlapping = _tile_boxes(baseline, tile, (nx, ny, nz))
+    eligible = inside > overlapping - inside + 1
+    if skip is not None:
+        eligible &= ~(tiles == skip).any(axis=1)
+    copies = np.flatnonzero(eligible & (sources != np.arange(len(tiles))))
+
+    marked = blocks.astype(np.int32)
+    if skip is not None:
+        marked[blocks == skip] = _CLONED
+    cloned = np.zeros(len(tiles), dtype=bool)
+    cloned[copies] = True
+    mask = cloned.reshape(nx, ny, nz).repeat(tx, 0).repeat(ty, 1).repeat(tz, 2)
+    marked[: nx * tx, : ny * ty, : nz * tz][mask] = _CLONED
+    boxes = mesh(marked, skip=_CLONED, max_volume=max_volume)
+
+    # Copies of neighbouring tiles along x whose sources are neighbours too
+    # are merged. Sources are never copies themselves so merged copies never
+    # overlap their source.
+    ix, iy, iz = np.unravel_index(copies, (nx, ny, nz))
+    sx, sy, sz = np.unravel_index(sources[copies], (nx, ny, nz))
+    order = np.lexsort((ix, sz, sy, sx - ix, iz, iy))
+    ix, iy, iz, sx, sy, sz = (a[order] for a in (ix, iy, iz, sx, sy, sz))
+    groups = _group(
+        (iy, iz, sx - ix, sy, sz),
+        ix,
+        np.full(len(ix), max_volume // (tx * ty * tz)),
+    )
+    starts = np.flatnonzero(np.diff(groups, prepend=-1))
+    lengths = np.diff(starts, append=len(groups))
+    clones = np.stack(
+        (
+            sx[starts] * tx,
+            sy[starts] * ty,
+            sz[starts] * tz,
+            lengths * tx,
+            np.full(len(starts), ty),
+            np.full(len(starts), tz),
+            ix[starts] * tx,
+            iy[starts] * ty,
+            iz[starts] * tz,
+        ),
+        axis=1,
+    ).astype(np.int64, copy=False)
+    if len(boxes) + len(clones) >= len(baseline):
+        return baseline, np.empty((0, 9), dtype=np.int64), baseline
+    return boxes, clones, baseline
+
+
+def deduplicate(
+    blocks: np.ndarray,
+    *,
+    tile: tuple[int, int, int] = (8, 8, 8),
+    skip: int | None = None,
+    max_volume: int = MAX_FILL_VOLUME,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Finds tiles of a structure that can be copied from an identical tile.
+
+    Only tiles that do not contain blocks to leave untouched are considered.
+    A tile is copied if it holds more boxes of
+    :func:`bedrock.ext.worldedit.mesh` than the copy cuts. If copying does
+    not save any commands at all, the boxes of
+    :func:`bedrock.ext.worldedit.mesh` are returned without copies.
+
+    Parameters
+    ----------
+    blocks
+        A three-dimensional array of integers indexed by ``x``, ``y`` and
+        ``z``.
+
+    tile
+        The size of a tile along each axis. Tiles must not be larger than
+        ``max_volume``.
+
+    skip
+        A value of ``blocks`` marking blocks to leave untouched.
+
+    max_volume
+        The maximum amount of blocks of a box or copy.
+
+    Returns
+    -------
+    tuple[numpy.ndarray, numpy.ndarray]
+        The boxes placing everything but the copies as returned by
+        :func:`bedrock.ext.worldedit.mesh` and an array of shape ``(n, 9)``
+        with a row per copy holding the indices of the lowest corner of the
+        source, the size of the copy along each axis and the indices of the
+        lowest corner of the destination.
+
+    Raises
+    ------
+    ValueError
+        A tile is larger than ``max_volume``.
+    """
+    boxes, clones, _ = _deduplicate(blocks, tile, skip, max_volume)
+    return boxes, clones
+
+
+def clone_commands(clones: np.ndarray, origin: Origin = (0, 0, 0)) -> Iterator[str]:
+    """Yields the ``clone`` commands of copies.
+
+    Parameters
+    ----------
+    clones
+        The copies as returned by :func:`deduplicate`.
+
+    origin
+        The world coordinates of the block at index ``[0, 0, 0]``.
+    """
+    ox, oy, oz = origin
+    for x, y, z, dx, dy, dz, tx, ty, tz in clones.tolist():
+        x += ox
+        y += oy
+        z += oz
+        yield (
+            f"clone {x} {y} {z} {x + dx - 1} {y + dy - 1} {z + dz - 1}"
+            f" {tx + ox} {ty + oy} {tz + oz}"
+        )
+
+
+async def place(
+    target: Target,
+    blocks: np.ndarray,
+    palette: Sequence[str],
+    origin: Origin = (0, 0, 0),
+    *,
+    tile: tuple[int, int, int] = (8, 8, 8),
+    skip: int | None = None,
+    **kwargs: Any,
+) -> DeduplicationReport:
+    """Places an array of blocks in the world, copying repeated tiles.
+
+    The copies are only sent once all boxes have been responded to so that
+    every tile has been placed by the time it is copied. Copies whose source
+    overlaps a box that failed are left out. The commands are sent with
+    :meth:`bedrock.session.Session.run_many`.
+
+    Parameters
+    ----------
+    target
+        The server or session to run the commands with.
+
+    blocks
+        A three-dimensional array of indices into ``palette``.
+
+    palette
+        The blocks referred to by ``blocks``.
+
+    origin
+        The world coordinates of the block at index ``[0, 0, 0]``.
+
+    tile
+        The size of a tile along each axis. Smaller tiles find more
+        repetitions but need more ``clone`` commands.
+
+    skip
+        A value of ``blocks`` marking blocks to leave untouched.
+
+    **kwargs
+        Passed on to :meth:`bedrock.session.Session.run_many`.
+
+    Returns
+    -------
+    DeduplicationReport
+        The savings and the statistics of the commands sent.
+    """
+    boxes, clones, baseline = _deduplicate(blocks, tile, skip, MAX_FILL_VOLUME)
+    nx, ny, nz = (size // t for size, t in zip(blocks.shape, tile))
+    report = DeduplicationReport(
+        tiles=nx * ny * nz,
+        cloned_tiles=int(clones[:, 3].sum()) // tile[0],
+        commands=len(boxes) + len(clones),
+        baseline=len(baseline),
+    )
+
+    batch = target.run_many(commands(boxes, palette, origin), **kwargs)
+    failed = []
+    i = 0
+    async for response in batch:
+        if not response.ok:
+            failed.append(i)
+        i += 1
+    _add(report.stats, batch.stats)
+
+    if failed:
+        keep = np.ones(len(clones), dtype=bool)
+        lower, upper = clones[:, :3], clones[:, :3] + clones[:, 3:6]
+        for box in boxes[failed]:
+            keep &= ~(
+                (lower < box[:3] + box[3:6]).all(axis=1)
+                & (box[:3] < upper).all(axis=1)
+            )
+        report.skipped = len(clones) - int(keep.sum())
+        clones = clones[keep]
+    stats = await target.run_many(clone_commands(clones, origin), **kwargs).drain()
+    _add(report.stats, stats)
+    return report
@@ -0,0 +1,360 @@
+"""
+This module turns images into pixel art made of blocks.
+
+Every pixel is mapped to the block of a :class:`Palette` with the nearest
+color. Instead of comparing every pixel to every color, the nearest block of
+every color of a quantized RGB cube is computed once and stored in a lookup
+table. Mapping an image is then a single indexing operation no matter how
+large it is. Lookup tables are cached on disk so they are only computed once
+per palette.
+
+Images are NumPy arrays of shape ``(height, width, 3)`` or
+``(height, width, 4)`` with 8-bit channels as returned by e.g.
+``numpy.asarray(PIL.Image.open(path))``. Pixels that are less than half
+opaque are left untouched.
+
+
+Example
+=======
+
+.. code-block:: python
+
+    import numpy as np
+    from PIL import Image
+    from bedrock.ext.worldedit import image
+
+    picture = np.asarray(Image.open("map.png").convert("RGBA"))
+
+    @app.game_event
+    async def player_message(ctx):
+        if ctx.message == "draw":
+            await image.place(ctx.server, picture, image.CONCRETE, (0, 100, 0))
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+import hashlib
+import logging
+import os
+from pathlib import Path
+from typing import Any, Literal
+
+from attrs import define, field
+import numpy as np
+
+from ...batch import BatchStats
+from . import Origin, Target
+from . import place as place_blocks
+
+logger = logging.getLogger(__name__)
+
+Plane = Literal["xz", "xy", "zy"]
+"""The plane of the world an image is placed in.
+
+The columns of the image run along the first axis and its rows along the
+second one. Vertical images have their first row at the top.
+"""
+
+_BAYER = (
+    np.array(
+        [
+            [0, 8, 2, 10],
+            [12, 4, 14, 6],
+            [3, 11, 1, 9],
+            [15, 7, 13, 5],
+        ]
+    )
+    + 0.5
+) / 16 - 0.5
+
+
+def _cache_dir() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "bedrockpy"
+
+
+def _blocks(blocks: Iterable[str]) -> tuple[str, ...]:
+    return tuple(blocks)
+
+
+def _colors(colors: Any) -> np.ndarray:
+    return np.asarray(colors, dtype=np.uint8).reshape(-1, 3)
+
+
+@define(frozen=True)
+class Palette:
+    """Blocks and their colors.
+
+    Attributes
+    ----------
+    blocks
+        The blocks (e.g. ``'concrete ["color":"red"]'``).
+
+    colors
+        The RGB color of each block as an array of shape ``(n, 3)``.
+    """
+
+    blocks: tuple[str, ...] = field(converter=_blocks)
+    colors: np.ndarray = field(converter=_colors, eq=False)
+
+    def __attrs_post_init__(self) -> None:
+        if len(self.blocks) != len(self.colors):
+            raise ValueError("expected a color for every block")
+
+    @property
+    def key(self) -> str:
+        """A hash of the colors identifying the lookup tables of the palette."""
+        return hashlib.sha256(self.colors.tobytes()).hexdigest()[:16]
+
+
+_luts: dict[tuple[str, int], np.ndarray] = {}
+
+
+def _build(palette: Palette, bits: int) -> np.ndarray:
+    size = 1 << bits
+    step = 256 / size
+    levels = (np.arange(size) + 0.5) * step
+    r, g, b = np.meshgrid(levels, levels, levels, indexing="ij")
+    cube = np.stack((r, g, b), axis=-1).reshape(-1, 1, 3)
+    colors = palette.colors.astype(np.float32)
+    table = np.empty(len(cube), dtype=np.uint16)
+    # chunks keep the distance matrix small for large palettes
+    for start in range(0, len(cube), 1 << 15):
+        chunk = cube[start : start + (1 << 15)]
+        distances = ((chunk - colors) ** 2).sum(axis=-1)
+        table[start : start + len(chunk)] = distances.argmin(axis=1)
+    return table.reshape(size, size, size)
+
+
+def _load(path: Path, bits: int) -> np.ndarray | None:
+    """Returns a cached table or ``None`` if it is missing or damaged."""
+    try:
+        table: np.ndarray = np.load(path)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, EOFError):
+        logger.warning("ignoring damaged lookup table %s", path)
+        return None
+    if table.shape != (1 << bits,) * 3 or table.dtype != np.uint16:
+        logger.warning("ignoring damaged lookup table %s", path)
+        return None
+    return table
+
+
+def _store(path: Path, table: np.ndarray) -> None:
+    """Writes a table to the cache atomically so that other processes never
+    see it half written."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with temporary.open("wb") as file:
+        np.save(file, table)
+    os.replace(temporary, path)
+
+
+def lut(palette: Palette, bits: int = 6, *, cache: bool = True) -> np.ndarray:
+    """Returns the lookup table of a palette.
+
+    Parameters
+    ----------
+    palette
+        The palette.
+
+    bits
+        The amount of bits of each channel the table distinguishes. Colors
+        are matched more precisely with more bits at the cost of a larger
+        table (``2 ** (3 * bits)`` entries).
+
+    cache
+        Loads the table from and stores it in the user's cache directory.
+        Damaged tables in the cache are computed again.
+
+    Returns
+    -------
+    numpy.ndarray
+        An array of shape ``(2 ** bits,) * 3`` holding the index of the block
+        nearest to each color.
+    """
+    key = (palette.key, bits)
+    table = _luts.get(key)
+    if table is not None:
+        return table
+
+    path = _cache_dir() / f"lut-{palette.key}-{bits}.npy"
+    table = _load(path, bits) if cache else None
+    if table is None:
+        table = _build(palette, bits)
+        if cache:
+            _store(path, table)
+    _luts[key] = table
+    return table
+
+
+def quantize(
+    image: np.ndarray,
+    palette: Palette,
+    *,
+    dither: bool = False,
+    bits: int = 6,
+    cache: bool = True,
+) -> np.ndarray:
+    """Maps every pixel of an image to the block with the nearest color.
+
+    Parameters
+    ----------
+    image
+        An RGB or RGBA image.
+
+    palette
+        The blocks to use.
+
+    dither
+        Applies ordered dithering which approximates colors that are not in
+        the palette by a pattern of nearby colors.
+
+    bits
+        Passed on to :func:`lut`.
+
+    cache
+        Passed on to :func:`lut`.
+
+    Returns
+    -------
+    numpy.ndarray
+        An array of shape ``(height, width)`` of indices into
+        ``palette.blocks``. Transparent pixels are ``-1``.
+
+    Raises
+    ------
+    ValueError
+        The image is neither RGB nor RGBA.
+    """
+    if image.ndim != 3 or image.shape[2] not in (3, 4):
+        raise ValueError(f"expected an RGB or RGBA image, got shape {image.shape}")
+    table = lut(palette, bits, cache=cache)
+    rgb = image[..., :3]
+    if dither:
+        height, width = rgb.shape[:2]
+        threshold = np.tile(_BAYER, (height // 4 + 1, width // 4 + 1))[:height, :width]
+        # the spread of the dither is the average distance between colors
+        spread = 256 / max(2, round(len(palette.colors) ** (1 / 3)))
+        shifted = rgb + (threshold * spread)[..., None]
+        rgb = np.clip(shifted, 0, 255).astype(np.uint8)
+    indices = rgb >> (8 - bits)
+    blocks: np.ndarray = table[indices[..., 0], indices[..., 1], indices[..., 2]]
+    blocks = blocks.astype(np.int32)
+    if image.shape[2] == 4:
+        blocks[image[..., 3] < 128] = -1
+    return blocks
+
+
+async def place(
+    target: Target,
+    image: np.ndarray,
+    palette: Palette,
+    origin: Origin = (0, 0, 0),
+    *,
+    plane: Plane = "xz",
+    dither: bool = False,
+    bits: int = 6,
+    cache: bool = True,
+    **kwargs: Any,
+) -> BatchStats:
+    """Places an image in the world.
+
+    Runs of pixels of the same block are merged into ``fill`` commands which
+    are sent with :meth:`bedrock.session.Session.run_many`.
+
+    Parameters
+    ----------
+    target
+        The server or session to run the commands with.
+
+    image
+        An RGB or RGBA image.
+
+    palette
+        The blocks to use.
+
+    origin
+        The world coordinates of the lowest corner of the image.
+
+    plane
+        The plane to place the image in.
+
+    dither
+        Passed on to :func:`quantize`.
+
+    bits
+        Passed on to :func:`quantize`.
+
+    cache
+        Passed on to :func:`quantize`.
+
+    **kwargs
+        Passed on to :meth:`bedrock.session.Session.run_many`.
+
+    Returns
+    -------
+    bedrock.batch.BatchStats
+        The statistics of the commands sent.
+
+    Raises
+    ------
+    ValueError
+        The plane is unknown or the image is neither RGB nor RGBA.
+    """
+    pixels = quantize(image, palette, dither=dither, bits=bits, cache=cache)
+    if plane == "xz":
+        blocks = pixels.T[:, None, :]
+    elif plane == "xy":
+        blocks = pixels[::-1].T[:, :, None]
+    elif plane == "zy":
+        blocks = pixels[None, ::-1, :]
+    else:
+        raise ValueError(f"unknown plane {plane!r}")
+    return await place_blocks(target, blocks, palette.blocks, origin, skip=-1, **kwargs)
+
+
+CONCRETE = Palette(
+    [
+        f'concrete ["color":"{color}"]'
+        for color in (
+            "white",
+            "orange",
+            "magenta",
+            "light_blue",
+            "yellow",
+            "lime",
+            "pink",
+            "gray",
+            "silver",
+            "cyan",
+            "purple",
+            "blue",
+            "brown",
+            "green",
+            "red",
+            "black",
+        )
+    ],
+    [
+        (207, 213, 214),
+        (224, 97, 1),
+        (169, 48, 159),
+        (36, 137, 199),
+        (241, 175, 21),
+        (94, 169, 24),
+        (214, 101, 143),
+        (55, 58, 62),
+        (125, 125, 115),
+        (21, 119, 136),
+        (100, 32, 156),
+        (45, 47, 143),
+        (96, 60, 32),
+        (73, 91, 36),
+        (142, 33, 33),
+        (8, 10, 15),
+    ],
+)
+"""The 16 colors of concrete."""
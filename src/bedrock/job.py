@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import AsyncIterable, AsyncIterator, Callable, Iterable
+import itertools
+import json
+import logging
+import os
+from pathlib import Path
+import time
+from typing import TYPE_CHECKING, Union
+
+from attrs import define, field
+
+if TYPE_CHECKING:
+    from .server import Server
+    from .session import Session
+
+
+logger = logging.getLogger(__name__)
+
+CommandSource = Callable[[], Union[Iterable[str], AsyncIterable[str]]]
+"""A callable returning the commands of a :class:`CommandJob` from the start
+each time it is called."""
+
+_SAMPLES = 16
+
+
+async def _skip(commands: AsyncIterable[str], count: int) -> AsyncIterator[str]:
+    i = 0
+    async for command in commands:
+        if i >= count:
+            yield command
+        i += 1
+
+
+@define
+class CommandJob:
+    """A long running sequence of commands that can be resumed.
+
+    The job counts the commands acknowledged by the client, that is the
+    commands whose response has been received and all commands before them.
+    Commands that have been sent but not responded to do not count. The
+    position is written to a checkpoint file regularly so that the job
+    continues after the last acknowledged command when it is run again,
+    whether the client reconnected or the program has been restarted.
+
+    Commands in flight when the connection is lost are sent again when the
+    job is resumed, so each command is run at least once. Commands like
+    ``fill`` or ``setblock`` can safely be run twice.
+
+    Examples
+    --------
+
+    .. code-block:: python
+
+        from bedrock.job import CommandJob
+
+        def build():
+            for x in range(1_000_000):
+                yield f"setblock {x} 0 0 stone"
+
+        job = CommandJob(build, "build.json", total=1_000_000)
+
+        @app.server_event
+        async def connect(ctx):
+            # continues where the last connection left off
+            await job.run(ctx.session)
+
+    Attributes
+    ----------
+    total
+        The amount of commands of the job if known. It is used to estimate
+        the time left.
+
+    checkpoint_interval
+        The amount of seconds between writing checkpoints.
+    """
+
+    _commands: CommandSource
+    _path: str | os.PathLike[str] | None = None
+    total: int | None = field(default=None, kw_only=True)
+    checkpoint_interval: float = field(default=1.0, kw_only=True)
+    _position: int = field(init=False, default=0)
+    _failed: int = field(init=False, default=0)
+    _done: bool = field(init=False, default=False)
+    _samples: deque[tuple[float, int]] = field(
+        init=False, factory=lambda: deque(maxlen=_SAMPLES)
+    )
+    _checkpointed: float = field(init=False, default=0.0)
+
+    def __attrs_post_init__(self) -> None:
+        if self._path is not None:
+            self.load()
+
+    @property
+    def path(self) -> Path | None:
+        """The path of the checkpoint file or ``None`` if checkpoints are
+        disabled."""
+        return None if self._path is None else Path(self._path)
+
+    @property
+    def position(self) -> int:
+        """The amount of commands acknowledged by the client."""
+        return self._position
+
+    @property
+    def failed(self) -> int:
+        """The amount of acknowledged commands that did not run successfully."""
+        return self._failed
+
+    @property
+    def done(self) -> bool:
+        """Returns ``True`` once all commands have been acknowledged."""
+        return self._done
+
+    @property
+    def commands_per_second(self) -> float:
+        """The amount of commands acknowledged per second recently."""
+        if len(self._samples) < 2:
+            return 0.0
+        (start, first), (stop, last) = self._samples[0], self._samples[-1]
+        if stop <= start:
+            return 0.0
+        return (last - first) / (stop - start)
+
+    @property
+    def eta(self) -> float | None:
+        """The estimated amount of seconds left or ``None`` if :attr:`total`
+        is unknown or nothing has been acknowledged recently."""
+        if self._done:
+            return 0.0
+        rate = self.commands_per_second
+        if self.total is None or rate <= 0:
+            return None
+        return max(self.total - self._position, 0) / rate
+
+    def load(self) -> None:
+        """Reads the progress from the checkpoint file if it exists.
+
+        Raises
+        ------
+        ValueError
+            The checkpoint file is malformed.
+        """
+        path = self.path
+        if path is None or not path.exists():
+            return
+        data = json.loads(path.read_text())
+        try:
+            self._position = int(data["position"])
+            self._failed = int(data["failed"])
+            self._done = bool(data["done"])
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"malformed checkpoint {str(path)!r}") from e
+        logger.debug("resuming job at %d from %s", self._position, path)
+
+    def checkpoint(self) -> None:
+        """Writes the progress to the checkpoint file.
+
+        The file is replaced atomically so that it is never left half
+        written.
+        """
+        self._checkpointed = time.monotonic()
+        path = self.path
+        if path is None:
+            return
+        data = {"position": self._position, "failed": self._failed, "done": self._done}
+        temporary = path.with_name(path.name + ".tmp")
+        temporary.write_text(json.dumps(data))
+        os.replace(temporary, path)
+
+    def reset(self) -> None:
+        """Forgets the progress and removes the checkpoint file so that the
+        job starts from the beginning when it is run again."""
+        self._position = 0
+        self._failed = 0
+        self._done = False
+        self._samples.clear()
+        if self.path is not None:
+            self.path.unlink(missing_ok=True)
+
+    def _remaining(self) -> Iterable[str] | AsyncIterable[str]:
+        commands = self._commands()
+        if isinstance(commands, AsyncIterable):
+            return _skip(commands, self._position)
+        return itertools.islice(commands, self._position, None)
+
+    def _sample(self, now: float) -> None:
+        self._samples.append((now, self._position))
+
+    async def run(
+        self,
+        target: Server | Session,
+        *,
+        version: str | list[str] | None = None,
+        origin: str = "player",
+    ) -> None:
+        """Runs the commands after the last acknowledged one.
+
+        Returns once all commands have been acknowledged. If the connection
+        is lost, the error is raised after writing a checkpoint and the job
+        can be run again once a client is connected.
+
+        Parameters
+        ----------
+        target
+            The server or session to run the commands with.
+
+        version
+            The Minecraft version the command syntax relies on.
+
+        origin
+            The type of the origin the command is executed by.
+        """
+        if self._done:
+            return
+        batch = target.run_many(self._remaining(), version=version, origin=origin)
+        self._samples.clear()
+        self._sample(time.monotonic())
+        try:
+            async for response in batch:
+                # The batch yields the responses in the order of the commands
+                # so all commands before this one have been acknowledged too.
+                self._position += 1
+                if not response.ok:
+                    self._failed += 1
+                now = time.monotonic()
+                if now - self._checkpointed >= self.checkpoint_interval:
+                    self._sample(now)
+                    self.checkpoint()
+            self._done = True
+        finally:
+            self._sample(time.monotonic())
+            self.checkpoint()
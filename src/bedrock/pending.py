@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from collections.abc import Iterator
+import heapq
+import math
+import time
+
+from attrs import define, field
+
+from .request import CommandRequest
+
+
+@define
+class PendingRequests:
+    """An index of the command requests that have been sent to the client
+    but have not been responded to yet.
+
+    Requests are keyed by their request id so that inserting, looking up and
+    removing a request takes constant time no matter how many requests are
+    in flight. The insertion order is preserved which allows retrieving the
+    oldest pending request in constant time as well.
+
+    Requests may have a deadline. The deadlines are kept in a heap so that
+    adding a request and expiring the next one takes logarithmic time.
+    Deadlines of requests that have been responded to are only removed from
+    the heap once they are due or the heap grew much larger than the amount
+    of pending requests.
+
+    Requests the client rejected are parked (see :meth:`park`) while they
+    wait to be resubmitted. They stay pending but do not hold a slot of the
+    window until they are sent again.
+    """
+
+    _requests: OrderedDict[str, tuple[CommandRequest, float]] = field(
+        init=False, factory=OrderedDict
+    )
+    _deadlines: list[tuple[float, str]] = field(init=False, factory=list)
+    _resubmits: dict[str, int] = field(init=False, factory=dict)
+    _parked: set[str] = field(init=False, factory=set)
+
+    def __len__(self) -> int:
+        return len(self._requests)
+
+    def __contains__(self, request_id: object) -> bool:
+        return request_id in self._requests
+
+    def __iter__(self) -> Iterator[CommandRequest]:
+        return (request for request, _ in self._requests.values())
+
+    @property
+    def in_flight(self) -> int:
+        """The amount of requests awaiting a response."""
+        return len(self._requests)
+
+    def add(self, request: CommandRequest, timeout: float | None = None) -> None:
+        """Adds a request to the index.
+
+        Parameters
+        ----------
+        request
+            The request.
+
+        timeout
+            The amount of seconds after which the request expires (see
+            :meth:`expire`). It never expires if this is ``None``.
+
+        Raises
+        ------
+        ValueError
+            A request with the same request id is already pending.
+        """
+        if request.request_id in self._requests:
+            raise ValueError(f"request {request.request_id!r} is already pending")
+        now = time.monotonic()
+        self._requests[request.request_id] = (request, now)
+        if timeout is not None and not math.isinf(timeout):
+            deadlines = self._deadlines
+            if len(deadlines) > 2 * len(self._requests) + 1024:
+                # drop the deadlines of requests that have been responded to
+                deadlines[:] = [d for d in deadlines if d[1] in self._requests]
+                heapq.heapify(deadlines)
+            heapq.heappush(deadlines, (now + timeout, request.request_id))
+
+    def next_deadline(self) -> float | None:
+        """Returns the earliest deadline of a pending request as returned by
+        :external+python:func:`time.monotonic` or ``None`` if no pending
+        request has a deadline."""
+        deadlines = self._deadlines
+        while deadlines and deadlines[0][1] not in self._requests:
+            heapq.heappop(deadlines)
+        return deadlines[0][0] if deadlines else None
+
+    def expire(self, now: float | None = None) -> list[tuple[CommandRequest, bool]]:
+        """Removes and returns the pending requests whose deadline passed
+        along with whether each of them was parked.
+
+        Parameters
+        ----------
+        now
+            The current time as returned by
+            :external+python:func:`time.monotonic`.
+        """
+        if now is None:
+            now = time.monotonic()
+        expired = []
+        deadlines = self._deadlines
+        while deadlines and deadlines[0][0] <= now:
+            _, request_id = heapq.heappop(deadlines)
+            entry = self._requests.pop(request_id, None)
+            if entry is not None:
+                self._resubmits.pop(request_id, None)
+                parked = request_id in self._parked
+                self._parked.discard(request_id)
+                expired.append((entry[0], parked))
+        return expired
+
+    def get(self, request_id: str) -> CommandRequest | None:
+        """Returns the pending request with the given request id or ``None``."""
+        entry = self._requests.get(request_id)
+        return None if entry is None else entry[0]
+
+    def pop(self, request_id: str) -> CommandRequest | None:
+        """Removes and returns the pending request with the given request id.
+
+        Returns ``None`` when there is no such request.
+        """
+        entry = self._requests.pop(request_id, None)
+        if self._resubmits:
+            self._resubmits.pop(request_id, None)
+            self._parked.discard(request_id)
+        return None if entry is None else entry[0]
+
+    def take(self, request_id: str) -> tuple[CommandRequest, float] | None:
+        """Removes and returns the pending request with the given request id
+        along with the time it has been sent at as returned by
+        :external+python:func:`time.monotonic`.
+
+        Returns ``None`` when there is no such request.
+        """
+        if self._resubmits:
+            self._resubmits.pop(request_id, None)
+            self._parked.discard(request_id)
+        return self._requests.pop(request_id, None)
+
+    def resubmits(self, request_id: str) -> int:
+        """Returns the amount of times a pending request has been resubmitted
+        because the client's command queue was full."""
+        return self._resubmits.get(request_id, 0)
+
+    def resubmitted(self, request_id: str) -> int:
+        """Counts a resubmission of a pending request and returns the amount
+        of times it has been resubmitted so far."""
+        count = self._resubmits.get(request_id, 0) + 1
+        self._resubmits[request_id] = count
+        return count
+
+    def park(self, request_id: str) -> None:
+        """Marks a pending request as waiting to be resubmitted after it gave
+        back its slot of the window."""
+        if request_id in self._requests:
+            self._parked.add(request_id)
+
+    def unpark(self, request_id: str) -> None:
+        """Marks a parked request as holding a slot of the window again."""
+        self._parked.discard(request_id)
+
+    def is_parked(self, request_id: str) -> bool:
+        """Returns ``True`` if a pending request is waiting to be resubmitted
+        and does not hold a slot of the window."""
+        return request_id in self._parked
+
+    def oldest_age(self) -> float | None:
+        """Returns the amount of seconds the oldest pending request is waiting
+        for a response or ``None`` if no request is pending."""
+        if not self._requests:
+            return None
+        _, sent_at = next(iter(self._requests.values()))
+        return time.monotonic() - sent_at
+
+    def clear(self) -> None:
+        """Removes all pending requests."""
+        self._requests.clear()
+        self._deadlines.clear()
+        self._resubmits.clear()
+        self._parked.clear()
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Mapping
+from enum import Enum
+from typing import Any
+
+from attrs import define, field
+import convert_case
+
+
+class Overflow(str, Enum):
+    """What an :class:`IngestQueue` does with a game event when it is full."""
+
+    BLOCK = "block"
+    """Wait until there is room. This stops reading from the client."""
+
+    DROP_OLDEST = "drop_oldest"
+    """Drop the oldest queued game event to make room for the new one."""
+
+    DROP_EVENT = "drop_event"
+    """Drop the new game event if it is one of :attr:`IngestQueue.droppable`.
+    Other game events wait until there is room."""
+
+
+@define
+class IngestQueue:
+    """A bounded queue of game events received from a client.
+
+    Each session reads messages from its client in one task. Responses to
+    command requests are handled right away so that slots of the window are
+    freed as soon as possible. Game events are put into this queue and
+    dispatched to their handlers by a separate task so that a burst of game
+    events or slow dispatching does not delay reading responses.
+
+    Attributes
+    ----------
+    maxsize
+        The maximum amount of queued game events.
+
+    overflow
+        What to do with a game event when the queue is full.
+
+    droppable
+        The names of the game events (e.g. ``'player_travelled'``) that may
+        be dropped with :attr:`Overflow.DROP_EVENT`.
+    """
+
+    maxsize: int = 10_000
+    overflow: Overflow = Overflow.BLOCK
+    droppable: frozenset[str] = field(default=frozenset(), converter=frozenset)
+    _droppable_wire: frozenset[str] = field(init=False)
+    _queue: asyncio.Queue[tuple[str, Mapping[str, Any]]] = field(init=False)
+    _dropped: int = field(init=False, default=0)
+
+    def __attrs_post_init__(self) -> None:
+        self._droppable_wire = frozenset(
+            convert_case.pascal_case(name) for name in self.droppable
+        )
+        self._queue = asyncio.Queue(self.maxsize)
+
+    @property
+    def size(self) -> int:
+        """The amount of queued game events."""
+        return self._queue.qsize()
+
+    @property
+    def dropped(self) -> int:
+        """The amount of game events dropped because the queue was full."""
+        return self._dropped
+
+    async def put(self, event_name: str, data: Mapping[str, Any]) -> None:
+        """Queues a game event.
+
+        Parameters
+        ----------
+        event_name
+            The name of the event as sent by the client (in pascal case).
+
+        data
+            The body of the event.
+        """
+        queue = self._queue
+        if not queue.full():
+            queue.put_nowait((event_name, data))
+        elif self.overflow is Overflow.DROP_OLDEST:
+            queue.get_nowait()
+            self._dropped += 1
+            queue.put_nowait((event_name, data))
+        elif self.overflow is Overflow.DROP_EVENT and event_name in self._droppable_wire:
+            self._dropped += 1
+        else:
+            await queue.put((event_name, data))
+
+    async def get(self) -> tuple[str, Mapping[str, Any]]:
+        """Removes and returns the oldest game event, waiting for one if the
+        queue is empty."""
+        return await self._queue.get()
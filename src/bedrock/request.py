@@ -1,32 +1,119 @@
 import asyncio
-from collections.abc import Mapping
-from uuid import UUID
+from collections.abc import Callable, Iterator, Mapping
+import itertools
+import json
+import time
+from uuid import UUID, uuid4
 from typing import Any
 
-from attrs import define
+from attrs import define, field
 
 from .response import CommandResponse
+from .window import Lane, Source, current_source
+
+
+RequestIdGenerator = Callable[[], str]
+"""A callable returning a new unique request id each time it is called."""
 
 
 @define
+class RequestIds:
+    """The default generator of request ids.
+
+    Instead of generating a random UUID for each request, a random prefix is
+    generated once and followed by a counter. The ids are still shaped like
+    a UUID so the client accepts them.
+
+    Examples
+    --------
+
+    .. code-block:: python
+
+        >>> from bedrock.request import RequestIds
+        >>> ids = RequestIds()
+        >>> ids()
+        '8c1e0f5a-3b7d-4c2e-9f10-000000000000'
+        >>> ids()
+        '8c1e0f5a-3b7d-4c2e-9f10-000000000001'
+    """
+
+    _prefix: str = field(factory=lambda: str(uuid4())[:24])
+    _counter: Iterator[int] = field(init=False, factory=itertools.count)
+
+    @property
+    def prefix(self) -> str:
+        """The part all request ids generated have in common."""
+        return self._prefix
+
+    def __call__(self) -> str:
+        return f"{self._prefix}{next(self._counter) & 0xFFFFFFFFFFFF:012x}"
+
+
+@define(frozen=True, weakref_slot=False)
 class CommandRequest:
-    """A command request sent to the server."""
+    """A command request sent to the server.
+
+    Requests are immutable and only hold what is needed to correlate the
+    response and to send the request again: the serialized frame rather than
+    the data it has been serialized from.
+    """
 
-    _identifier: UUID
-    _data: Mapping[str, Any]
+    _request_id: str
+    _frame: str
     _response: asyncio.Future[CommandResponse]
+    _lane: Lane = field(default=Lane.NORMAL, kw_only=True)
+    _source: Source = field(factory=current_source, kw_only=True)
+    _created: float = field(init=False, factory=time.monotonic)
+
+    @property
+    def request_id(self) -> str:
+        """The unique id of the request as it is sent to the client."""
+        return self._request_id
 
     @property
     def identifier(self) -> UUID:
-        """The unique id of the request."""
-        return self._identifier
+        """The unique id of the request as a :external+python:class:`uuid.UUID`.
+
+        Raises
+        ------
+        ValueError
+            The request id is not shaped like a UUID. This can only happen
+            if a custom :data:`RequestIdGenerator` is used.
+        """
+        return UUID(self._request_id)
+
+    @property
+    def frame(self) -> str:
+        """The serialized data of the request as it is sent to the client."""
+        return self._frame
 
     @property
     def data(self) -> Mapping[str, Any]:
-        """The data of the request."""
-        return self._data
+        """The data of the request.
+
+        .. note:: The data is decoded from :attr:`frame` on every access.
+        """
+        value = json.loads(self._frame)
+        assert isinstance(value, Mapping)
+        return value
 
     @property
     def response(self) -> asyncio.Future[CommandResponse]:
         """The response of the response wrapped inside a :external+python:class:`asyncio.Future`."""
         return self._response
+
+    @property
+    def lane(self) -> Lane:
+        """The priority of the request."""
+        return self._lane
+
+    @property
+    def source(self) -> Source:
+        """Where the request comes from."""
+        return self._source
+
+    @property
+    def created(self) -> float:
+        """The time the request has been submitted at as returned by
+        :external+python:func:`time.monotonic`."""
+        return self._created
@@ -1,19 +1,30 @@
 from __future__ import annotations
 
 from collections.abc import Mapping
+import json
 from typing import Any
 
-from attrs import define
+from attrs import define, field
 
 from .exceptions import CommandRequestError
 
 
-@define
+@define(frozen=True, weakref_slot=False)
 class CommandResponse:
-    """A response sent by the client."""
+    """A response sent by the client.
+
+    Responses are immutable. Besides the status, the body of the response as
+    sent by the client is kept so that the additional fields some commands
+    respond with are available. Fields that hold JSON encoded as a string
+    (like :attr:`details`) are only decoded when they are accessed for the
+    first time.
+    """
 
     _message: str
     _status: int
+    _body: Mapping[str, Any] = field(factory=dict, kw_only=True, eq=False, repr=False)
+    # left unset until the details are decoded
+    _details: Any = field(init=False, eq=False, repr=False)
 
     @property
     def message(self) -> str:
@@ -30,12 +41,54 @@ class CommandResponse:
         """Returns ``True`` when the command has been executed successfully."""
         return self.status == 0
 
+    @property
+    def body(self) -> Mapping[str, Any]:
+        """The body of the response as sent by the client."""
+        return self._body
+
+    @property
+    def details(self) -> Any:
+        """The decoded ``details`` field of the body or ``None`` if there is
+        none.
+
+        Some commands respond with details encoded as JSON string, e.g.
+        ``querytarget`` responds with the position and rotation of each
+        target:
+
+        .. code-block:: python
+
+            response = await ctx.server.run("querytarget @s")
+            position = response.details[0]["position"]
+
+        Raises
+        ------
+        ValueError
+            The details are not valid JSON.
+        """
+        try:
+            return self._details
+        except AttributeError:
+            value = self._body.get("details")
+            if isinstance(value, (str, bytes)):
+                value = json.loads(value)
+            object.__setattr__(self, "_details", value)
+            return value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Returns a field of the body or ``default`` if it is missing."""
+        return self._body.get(key, default)
+
     @classmethod
     def parse(cls, data: Mapping[str, Any]) -> CommandResponse:
-        """Parses a JSON object sent by the client."""
+        """Parses a JSON object sent by the client.
+
+        This may be a ``commandResponse`` or an ``error`` message.
+        """
+        body = data["body"]
         return cls(
-            message=data["body"].get("statusMessage"),
-            status=data["body"]["statusCode"],
+            message=body.get("statusMessage"),
+            status=body.get("statusCode", -1),
+            body=body,
         )
 
     def raise_for_status(self) -> None:
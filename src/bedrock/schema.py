@@ -0,0 +1,404 @@
+"""
+This module declares the fields of the game events sent by the client.
+
+Each :class:`EventSchema` lists where its fields are located in the body of
+an event. The schema generates a record type and a decoder from that list.
+The decoder extracts every field in a single pass over the body. Each nested
+object is looked up only once, no matter how many fields are read from it.
+
+Records are `msgspec <https://pypi.org/project/msgspec/>`_ structs if msgspec
+is installed and named tuples otherwise. Records are immutable and
+fields missing from the body are ``None``.
+
+.. note::
+
+    The client does not document the bodies of its events and they differ
+    between versions of the game. The schemas only cover the fields known to
+    be sent. :attr:`bedrock.context.GameContext.data` always holds the whole
+    body.
+"""
+
+from __future__ import annotations
+
+from collections import namedtuple
+from collections.abc import Callable, Mapping
+from typing import Any, Optional
+
+from attrs import define, field
+import convert_case
+
+from .utils import Vector
+
+try:
+    import msgspec  # type: ignore
+except ImportError:
+    msgspec = None
+
+
+@define(frozen=True)
+class EventField:
+    """The location and type of a field in the body of a game event.
+
+    Attributes
+    ----------
+    path
+        The keys leading to the value, separated by dots (e.g. ``'item.id'``).
+
+    type
+        The type of the value. Positions (objects with ``x``, ``y`` and ``z``)
+        are converted to :class:`bedrock.utils.Vector`.
+    """
+
+    path: str
+    type: type = str
+
+    @property
+    def keys(self) -> tuple[str, ...]:
+        """The keys of :attr:`path`."""
+        return tuple(self.path.split("."))
+
+
+def _vector(value: Any) -> Vector | None:
+    if type(value) is not dict:
+        return None
+    return Vector(value["x"], value["y"], value["z"])
+
+
+@define
+class EventSchema:
+    """The fields of a game event.
+
+    Attributes
+    ----------
+    name
+        The name of the game event (e.g. ``'item_acquired'``).
+
+    fields
+        Maps the names of the fields of the record to their location in the
+        body of the event.
+    """
+
+    name: str
+    fields: Mapping[str, EventField] = field(factory=dict)
+    _record_type: type | None = field(init=False, default=None, repr=False)
+    _decoder: Callable[[Mapping[str, Any]], Any] | None = field(
+        init=False, default=None, repr=False
+    )
+
+    @property
+    def record_type(self) -> type:
+        """The type of the records returned by :meth:`decode`.
+
+        The type is generated on first access.
+        """
+        if self._record_type is None:
+            self._compile()
+        assert self._record_type is not None
+        return self._record_type
+
+    def decode(self, data: Mapping[str, Any]) -> Any:
+        """Extracts the fields from the body of an event.
+
+        Parameters
+        ----------
+        data
+            The body of the event.
+
+        Returns
+        -------
+        An instance of :attr:`record_type`.
+        """
+        if self._decoder is None:
+            self._compile()
+        assert self._decoder is not None
+        return self._decoder(data)
+
+    def _compile(self) -> None:
+        name = convert_case.pascal_case(self.name)
+        fields = list(self.fields)
+        record_type: Any
+        if msgspec is not None:
+            record_type = msgspec.defstruct(
+                name,
+                [(key, Optional[f.type], None) for key, f in self.fields.items()],
+                frozen=True,
+                gc=False,
+                module=__name__,
+            )
+        else:
+            defaults = [None] * len(fields)
+            record_type = namedtuple(name, fields, defaults=defaults)  # type: ignore
+            record_type.__module__ = __name__
+
+        # Each object along the paths is bound to a local variable once so
+        # that fields sharing a parent do not look it up again.
+        lines = ["def decode(data):"]
+        variables: dict[tuple[str, ...], str] = {(): "data"}
+        arguments = []
+        for f in self.fields.values():
+            keys = f.keys
+            for i in range(1, len(keys)):
+                parent = keys[:i]
+                if parent not in variables:
+                    variable = variables[parent] = f"_{len(variables)}"
+                    lines.append(
+                        f"    {variable} = {variables[parent[:-1]]}.get({parent[-1]!r})"
+                    )
+                    lines.append(
+                        f"    if type({variable}) is not dict: {variable} = _EMPTY"
+                    )
+            value = f"{variables[keys[:-1]]}.get({keys[-1]!r})"
+            if f.type is Vector:
+                value = f"_vector({value})"
+            arguments.append(value)
+        lines.append(f"    return _record({', '.join(arguments)})")
+
+        namespace: dict[str, Any] = {
+            "_EMPTY": {},
+            "_vector": _vector,
+            "_record": record_type,
+        }
+        exec("\n".join(lines), namespace)
+        self._record_type = record_type
+        self._decoder = namespace["decode"]
+
+
+def _fields(**fields: tuple[str, type] | str) -> dict[str, EventField]:
+    return {
+        key: EventField(value) if isinstance(value, str) else EventField(*value)
+        for key, value in fields.items()
+    }
+
+
+_PLAYER = _fields(
+    player="player.name",
+    position=("player.position", Vector),
+    dimension=("player.dimension", int),
+)
+
+_ITEM = _fields(
+    item="item.id",
+    item_namespace="item.namespace",
+    aux_value=("item.auxValue", int),
+)
+
+_BLOCK = _fields(
+    block="block.id",
+    block_namespace="block.namespace",
+    block_aux_value=("block.auxValue", int),
+)
+
+
+def _schema(name: str, *groups: dict[str, EventField], **fields: Any) -> EventSchema:
+    merged: dict[str, EventField] = {}
+    for group in groups:
+        merged.update(group)
+    merged.update(_fields(**fields))
+    return EventSchema(name, merged)
+
+
+_SCHEMAS = [
+    _schema("additional_content_loaded"),
+    _schema(
+        "agent_command",
+        _PLAYER,
+        command="commandName",
+        result="result",
+    ),
+    _schema("agent_created", _PLAYER),
+    _schema("api_init"),
+    _schema("app_paused"),
+    _schema("app_resumed"),
+    _schema("app_suspended"),
+    _schema("award_achievement", _PLAYER, achievement=("achievementId", int)),
+    _schema(
+        "block_broken",
+        _PLAYER,
+        _BLOCK,
+        count=("count", int),
+        destruction_method=("destructionMethod", int),
+        tool="tool.id",
+    ),
+    _schema(
+        "block_placed",
+        _PLAYER,
+        _BLOCK,
+        count=("count", int),
+        placement_method=("placementMethod", int),
+        placed_under_water=("placedUnderWater", bool),
+        tool="tool.id",
+    ),
+    _schema("board_text_updated", _PLAYER),
+    _schema(
+        "boss_killed",
+        _PLAYER,
+        boss_type=("boss.type", int),
+        party_size=("partySize", int),
+    ),
+    _schema("camera_used", _PLAYER, is_selfie=("isSelfie", bool)),
+    _schema(
+        "cauldron_used",
+        _PLAYER,
+        contents_color=("contentsColor", int),
+        contents_type=("contentsType", int),
+        fill_level=("fillLevel", int),
+    ),
+    _schema("configuration_changed"),
+    _schema("connection_failed"),
+    _schema("crafting_session_completed", _PLAYER),
+    _schema("end_of_day", _PLAYER),
+    _schema(
+        "entity_spawned",
+        _PLAYER,
+        mob_type=("mob.type", int),
+        spawn_type=("spawnType", int),
+    ),
+    _schema("file_transmission_cancelled"),
+    _schema("file_transmission_completed"),
+    _schema("file_transmission_started"),
+    _schema("first_time_client_open"),
+    _schema("focus_gained"),
+    _schema("focus_lost"),
+    _schema("game_session_complete"),
+    _schema("game_session_start"),
+    _schema("hardware_info"),
+    _schema("has_new_content"),
+    _schema(
+        "item_acquired",
+        _PLAYER,
+        _ITEM,
+        count=("count", int),
+        acquisition_method=("acquisitionMethodId", int),
+    ),
+    _schema(
+        "item_crafted",
+        _PLAYER,
+        _ITEM,
+        count=("count", int),
+        crafted_automatically=("craftedAutomatically", bool),
+        recipe_book_shown=("recipeBookShown", bool),
+        used_crafting_table=("usedCraftingTable", bool),
+        used_search_bar=("usedSearchBar", bool),
+    ),
+    _schema("item_destroyed", _PLAYER, _ITEM),
+    _schema("item_dropped", _PLAYER, _ITEM, count=("count", int)),
+    _schema("item_enchanted", _PLAYER, _ITEM),
+    _schema("item_smelted", _PLAYER, _ITEM, fuel="fuelSource.id"),
+    _schema(
+        "item_used",
+        _PLAYER,
+        _ITEM,
+        count=("count", int),
+        use_method=("useMethod", int),
+    ),
+    _schema("join_canceled"),
+    _schema("jukebox_used", _PLAYER),
+    _schema("license_census"),
+    _schema("mascot_created"),
+    _schema("menu_shown"),
+    _schema(
+        "mob_interacted",
+        _PLAYER,
+        interaction_type=("interactionType", int),
+        mob_type=("mob.type", int),
+        mob_variant=("mob.variant", int),
+        mob_color=("mob.color", int),
+    ),
+    _schema(
+        "mob_killed",
+        _PLAYER,
+        victim_type=("victim.type", int),
+        victim_variant=("victim.variant", int),
+        kill_method=("killMethodType", int),
+        is_monster=("isMonster", bool),
+    ),
+    _schema("multiplayer_connection_state_changed"),
+    _schema("multiplayer_round_end"),
+    _schema("multiplayer_round_start"),
+    _schema("npc_properties_updated", _PLAYER),
+    _schema("options_updated"),
+    _schema("performance_metrics"),
+    _schema("player_bounced", _PLAYER, _BLOCK, bounce_height=("bounceHeight", int)),
+    _schema(
+        "player_died",
+        _PLAYER,
+        cause=("cause", int),
+        killer_type=("killer.type", int),
+        in_raid=("inRaid", bool),
+    ),
+    _schema("player_join", _PLAYER),
+    _schema("player_leave", _PLAYER),
+    _schema(
+        "player_message",
+        message="message",
+        receiver="receiver",
+        sender="sender",
+        type="type",
+    ),
+    _schema(
+        "player_teleported",
+        _PLAYER,
+        cause=("cause", int),
+        item_type=("itemType", int),
+        meters=("metersTravelled", float),
+    ),
+    _schema("player_transform", _PLAYER, rotation=("player.yRot", float)),
+    _schema(
+        "player_travelled",
+        _PLAYER,
+        underwater=("isUnderwater", bool),
+        meters=("metersTravelled", float),
+        travel_method=("travelMethod", int),
+        new_biome=("newBiome", int),
+    ),
+    _schema("portal_built", _PLAYER, dimension_id=("dimensionId", int)),
+    _schema(
+        "portal_used",
+        _PLAYER,
+        from_dimension=("fromDimensionId", int),
+        to_dimension=("toDimensionId", int),
+    ),
+    _schema("portfolio_exported", _PLAYER),
+    _schema(
+        "potion_brewed",
+        _PLAYER,
+        potion_id=("potionId", int),
+        potion_type=("potionType", int),
+    ),
+    _schema("purchase_attempt"),
+    _schema("purchase_resolved"),
+    _schema("regional_popup"),
+    _schema("responded_to_accept_content"),
+    _schema("screen_changed", screen="screenName"),
+    _schema("screen_heartbeat", screen="screenName"),
+    _schema("sign_in_to_edu"),
+    _schema("sign_in_to_xbox_live"),
+    _schema("sign_out_of_xbox_live"),
+    _schema("special_mob_built", _PLAYER),
+    _schema("start_client"),
+    _schema("start_world"),
+    _schema("text_to_speech_toggled"),
+    _schema("ugc_download_completed"),
+    _schema("ugc_download_started"),
+    _schema("upload_skin"),
+    _schema("vehicle_exited", _PLAYER),
+    _schema("world_exported"),
+    _schema("world_files_listed"),
+    _schema("world_generated"),
+    _schema("world_loaded"),
+    _schema("world_unloaded"),
+]
+
+SCHEMAS: dict[str, EventSchema] = {schema.name: schema for schema in _SCHEMAS}
+"""Maps the names of game events to their schema."""
+
+
+def get_schema(name: str) -> EventSchema:
+    """Returns the schema of a game event.
+
+    Raises
+    ------
+    KeyError
+        There is no schema for the game event.
+    """
+    return SCHEMAS[name]
@@ -1,9 +1,8 @@
 import asyncio
-from collections.abc import Mapping
-import json
+from collections.abc import AsyncIterable, Callable, Iterable, Mapping
+from functools import partial
 import logging
 from typing import Any, Literal, overload
-import uuid
 import warnings
 
 from attrs import define, field
@@ -14,11 +13,17 @@ try:
 except ImportError:
     pass
 from websockets import server as wss
-from websockets.exceptions import ConnectionClosedError
 
-from . import consts, context, events, response
-from .request import CommandRequest
+from . import codec as codec_
+from . import context, events
+from .batch import CommandBatch
+from .codec import Codec
+from .pipeline import IngestQueue
+from .request import RequestIdGenerator, RequestIds
 from .response import CommandResponse
+from .session import Session, current_session
+from .throttle import KeyFunction, Throttle, player_key
+from .window import CommandWindow, Lane
 
 
 logger = logging.getLogger(__name__)
@@ -27,19 +32,72 @@ logger = logging.getLogger(__name__)
 @define
 class Server:
     """
-    A server handles the connection to a client in the game.
+    A server handles the connections to clients in the game.
+
+    Every client connected to the server is represented by a
+    :class:`bedrock.session.Session`. Commands sent through the server from
+    within an event handler go back to the client that triggered the event.
+    """
+
+    request_id_factory: Callable[[], RequestIdGenerator] = field(
+        default=RequestIds, kw_only=True
+    )
+    """Creates the :data:`bedrock.request.RequestIdGenerator` of each session."""
+
+    codec: Codec = field(factory=lambda: codec_.default, kw_only=True)
+    """The JSON codec used to decode and encode messages."""
+
+    ingest_factory: Callable[[], IngestQueue] = field(default=IngestQueue, kw_only=True)
+    """Creates the :class:`bedrock.pipeline.IngestQueue` of each session.
+
+    .. code-block:: python
+
+        from functools import partial
+
+        from bedrock.pipeline import IngestQueue, Overflow
+        from bedrock.server import Server
+
+        app = Server(
+            ingest_factory=partial(
+                IngestQueue,
+                1_000,
+                Overflow.DROP_EVENT,
+                droppable={"player_travelled", "player_transform"},
+            )
+        )
+    """
+
+    window_factory: Callable[[], CommandWindow] = field(
+        default=CommandWindow, kw_only=True
+    )
+    """Creates the :class:`bedrock.window.CommandWindow` of each session.
+
+    .. code-block:: python
+
+        from bedrock.server import Server
+        from bedrock.window import AdaptiveLimit, CommandWindow
+
+        # adapt the amount of commands in flight to the speed of the client
+        app = Server(window_factory=lambda: CommandWindow(controller=AdaptiveLimit()))
+    """
+
+    command_timeout: float | None = field(default=30.0, kw_only=True)
+    """The amount of seconds to wait for the response of a command by default
+    or ``None`` to wait forever.
+
+    Commands whose response does not arrive in time give up their slot of the
+    window and raise :external+python:class:`asyncio.TimeoutError`.
     """
 
     _game_event_handlers: list[events.GameEvent] = field(init=False, factory=list)
+    _game_event_index: dict[
+        str, tuple[tuple[events.GameEvent, ...], type[context.GameContext]]
+    ] = field(init=False, factory=dict)
+    _unknown_game_events: set[str] = field(init=False, factory=set)
     _server_event_handlers: list[events.ServerEvent] = field(init=False, factory=list)
     _loop: asyncio.AbstractEventLoop | None = field(init=False, default=None)
-    _ws: wss.WebSocketServerProtocol | None = field(init=False, default=None)
-    _is_connected: bool = field(init=False, default=False)
-    _command_processing_semaphore: asyncio.BoundedSemaphore = field(
-        init=False,
-        factory=lambda: asyncio.BoundedSemaphore(consts.MAX_COMMAND_PROCESSING),
-    )
-    _requests: list[CommandRequest] = field(init=False, factory=list)
+    _ws_server: wss.WebSocketServer | None = field(init=False, default=None)
+    _sessions: list[Session] = field(init=False, factory=list)
 
     def server_event(self, fn: events.EventHandler[context.ServerContext], /) -> events.ServerEvent:
         """Convenient way of adding a server event.
@@ -86,7 +144,44 @@ class Server:
         """
         self._server_event_handlers.remove(event)
 
-    def game_event(self, fn: events.EventHandler[context.GameContext], /) -> events.GameEvent:
+    @overload
+    def game_event(
+        self, fn: events.EventHandler[context.GameContext], /
+    ) -> events.GameEvent:
+        ...
+
+    @overload
+    def game_event(
+        self,
+        fn: None = None,
+        /,
+        *,
+        coalesce: float | None = None,
+        max_rate: float | None = None,
+        key: KeyFunction = player_key,
+        raw: bool = False,
+    ) -> Callable[
+        [events.EventHandler[context.GameContext] | events.RawEventHandler],
+        events.GameEvent,
+    ]:
+        ...
+
+    def game_event(
+        self,
+        fn: events.EventHandler[context.GameContext] | None = None,
+        /,
+        *,
+        coalesce: float | None = None,
+        max_rate: float | None = None,
+        key: KeyFunction = player_key,
+        raw: bool = False,
+    ) -> (
+        events.GameEvent
+        | Callable[
+            [events.EventHandler[context.GameContext] | events.RawEventHandler],
+            events.GameEvent,
+        ]
+    ):
         """Convenient way of adding a game event.
 
         The decorated function name must match the name of the event to listen to.
@@ -99,27 +194,76 @@ class Server:
         .. code-block:: python
 
             ...
-            @app.server_event
+            @app.game_event
             async def player_message(ctx):
                 ctx.reply("Hello World!")
 
+            # see the latest position of each player at most every 0.2 seconds
+            @app.game_event(coalesce=0.2)
+            async def player_transform(ctx):
+                ...
+
+            # skip creating a context
+            @app.game_event(raw=True)
+            async def player_travelled(data):
+                await app.run(f"say {data['metersTravelled']}")
+
         Parameters
         ----------
         fn
             The decorated function.
 
+        coalesce
+            See :attr:`bedrock.throttle.Throttle.coalesce`.
+
+        max_rate
+            See :attr:`bedrock.throttle.Throttle.max_rate`.
+
+        key
+            See :attr:`bedrock.throttle.Throttle.key`.
+
+        raw
+            Calls the function with the raw data of the event instead of a
+            context. Commands sent with the server from within the function
+            still go back to the client the event was received from.
+
         Returns
         -------
         events.GameEvent
             The function turned into a :class:`events.GameEvent`.
         """
-        event = events.GameEvent(fn.__name__, fn)
-        self.add_game_event(event)
-        return event
+
+        def decorator(
+            fn: events.EventHandler[context.GameContext] | events.RawEventHandler,
+            /,
+        ) -> events.GameEvent:
+            throttle: Throttle[Mapping[str, Any]] | None = None
+            if coalesce is not None or max_rate is not None:
+                throttle = Throttle(coalesce, max_rate, key)
+            event = events.GameEvent(
+                fn.__name__,
+                fn,  # type: ignore[arg-type]
+                throttle=throttle,
+                raw=raw,
+            )
+            self.add_game_event(event)
+            return event
+
+        if fn is None:
+            return decorator
+        return decorator(fn)
 
     def add_game_event(self, event: events.GameEvent) -> None:
-        """Adds a game event to the game event handlers."""
+        """Adds a game event to the game event handlers.
+
+        Clients that are already connected are subscribed to the event.
+        """
         self._game_event_handlers.append(event)
+        self._index_game_events()
+        if self._loop is not None:
+            for session in self._sessions:
+                if event.name not in session.subscriptions:
+                    self._loop.create_task(session.subscribe(event.name))
 
     def remove_game_event(self, event: events.GameEvent) -> None:
         """Removes a game event from the game event handlers.
@@ -130,6 +274,37 @@ class Server:
             Event is not registered.
         """
         self._game_event_handlers.remove(event)
+        self._index_game_events()
+
+    def sessions(self) -> tuple[Session, ...]:
+        """Returns the sessions of all clients currently connected."""
+        return tuple(self._sessions)
+
+    def session(self) -> Session:
+        """Returns the session commands are sent to by default.
+
+        Inside an event handler this is the session of the client that
+        triggered the event. Otherwise this is the only connected client.
+
+        Raises
+        ------
+        RuntimeError
+            The client that triggered the event disconnected, the server is
+            not connected to a client or the target client is ambiguous
+            because multiple clients are connected.
+        """
+        session = current_session()
+        if session is not None:
+            if not session.is_connected():
+                raise RuntimeError("client is not connected anymore")
+            return session
+        self._assert_connected()
+        if len(self._sessions) > 1:
+            raise RuntimeError(
+                "server is connected to multiple clients; "
+                "use a session or broadcast() instead"
+            )
+        return self._sessions[0]
 
     @overload
     async def send(
@@ -138,6 +313,8 @@ class Server:
         body: dict[str, Any],
         *,
         wait: Literal[True] = True,
+        priority: Lane = Lane.NORMAL,
+        timeout: float | None = None,
     ) -> CommandResponse:
         ...
 
@@ -148,6 +325,8 @@ class Server:
         body: dict[str, Any],
         *,
         wait: Literal[False],
+        priority: Lane = Lane.NORMAL,
+        timeout: float | None = None,
     ) -> None:
         ...
 
@@ -157,54 +336,17 @@ class Server:
         body: dict[str, Any],
         *,
         wait: bool = True,
+        priority: Lane = Lane.NORMAL,
+        timeout: float | None = None,
     ) -> CommandResponse | None:
-        """Sends data to the client.
+        """Sends data to the client of the current :meth:`session`.
 
-        Parameters
-        ----------
-        header
-            The header data for the request.
-
-        body
-            The body data for the request.
-
-        wait
-            Waits for a response when awaiting.
-
-        Returns
-        -------
-        CommandResponse
-            The response of the request wrapped in a :external+python:py:class:`asyncio.Future`.
+        .. seealso:: :meth:`bedrock.session.Session.send`
         """
-        self._assert_connected()
-        assert self._ws is not None
-        assert self._loop is not None
-
-        identifier = uuid.uuid4()
-        data = {
-            "header": header | {"version": 1, "requestId": str(identifier)},
-            "body": body,
-        }
-
-        request = CommandRequest(
-            identifier=identifier, data=data, response=self._loop.create_future()
+        return await self.session().send(  # type: ignore
+            header, body, wait=wait, priority=priority, timeout=timeout
         )
 
-        await self._command_processing_semaphore.acquire()
-        
-        logger.debug("sending data ...")
-        await self._ws.send(json.dumps(data))
-        logger.debug("sent data ...")
-
-        self._requests.append(request)
-        
-        if wait:
-            logger.debug("waiting for response ...")
-            res = await request.response
-            logger.debug("got response")
-            return res
-        return None
-
     async def subscribe(self, event_name: str) -> CommandResponse:
         """Subscribes to a game event.
 
@@ -217,12 +359,7 @@ class Server:
         event_name
             The name of the game event to subscribe to.
         """
-        self._assert_connected()
-
-        return await self.send(
-            header={"messageType": "commandRequest", "messagePurpose": "subscribe"},
-            body={"eventName": convert_case.pascal_case(event_name)},
-        )
+        return await self.session().subscribe(event_name)
 
     async def unsubscribe(self, event_name: str) -> CommandResponse:
         """Unsubscribes to a game event.
@@ -232,12 +369,7 @@ class Server:
         event_name
             The name of the game event to unsubcribe.
         """
-        self._assert_connected()
-
-        return await self.send(
-            header={"messageType": "commandRequest", "messagePurpose": "unsubscribe"},
-            body={"eventName": convert_case.pascal_case(event_name)},
-        )
+        return await self.session().unsubscribe(event_name)
 
     @overload
     async def run(
@@ -245,7 +377,10 @@ class Server:
         command: str,
         *,
         version: str | list[str] | None = None,
+        origin: str = "player",
         wait: Literal[True] = True,
+        priority: Lane = Lane.NORMAL,
+        timeout: float | None = None,
     ) -> CommandResponse:
         ...
 
@@ -255,7 +390,10 @@ class Server:
         command: str,
         *,
         version: str | list[str] | None = None,
-        wait: Literal[False]
+        origin: str = "player",
+        wait: Literal[False],
+        priority: Lane = Lane.NORMAL,
+        timeout: float | None = None,
     ) -> None:
         ...
 
@@ -264,9 +402,12 @@ class Server:
         command: str,
         *,
         version: str | list[str] | None = None,
+        origin: str = "player",
         wait: bool = True,
+        priority: Lane = Lane.NORMAL,
+        timeout: float | None = None,
     ) -> CommandResponse | None:
-        """Executes a Minecraft command.
+        """Executes a Minecraft command on the client of the current :meth:`session`.
 
         .. note:: The leading slash (``/``) may be omitted.
 
@@ -279,23 +420,123 @@ class Server:
             The Minecraft version the command syntax relies on. This can
             usually be ignored.
 
+        origin
+            The type of the origin the command is executed by.
+
         wait
             Waits for a response when awaiting.
+
+        priority
+            The lane of the command. See :class:`bedrock.window.Lane`.
+
+        timeout
+            The amount of seconds after sending the command to wait for its response.
+            The session's default is used if this is ``None``. Pass
+            ``math.inf`` to wait forever.
         """
-        version = version or consts.MINECRAFT_VERSION
-        command = command.removeprefix("/")
-        return await self.send(
-            header={
-                "messageType": "commandRequest",
-                "messagePurpose": "commandRequest",
-            },
-            body={
-                "version": version,
-                "commandLine": command,
-                "origin": {"type": "player"},
-            },
+        return await self.session().run(  # type: ignore
+            command,
+            version=version,
+            origin=origin,
             wait=wait,
-        )  # type: ignore
+            priority=priority,
+            timeout=timeout,
+        )
+
+    async def fire(
+        self,
+        command: str,
+        *,
+        version: str | list[str] | None = None,
+        origin: str = "player",
+        priority: Lane = Lane.NORMAL,
+    ) -> None:
+        """Executes a Minecraft command on the client of the current
+        :meth:`session` without keeping track of it.
+
+        .. seealso:: :meth:`bedrock.session.Session.fire`
+        """
+        await self.session().fire(
+            command, version=version, origin=origin, priority=priority
+        )
+
+    def run_many(
+        self,
+        commands: Iterable[str] | AsyncIterable[str],
+        *,
+        version: str | list[str] | None = None,
+        origin: str = "player",
+        priority: Lane = Lane.NORMAL,
+        timeout: float | None = None,
+    ) -> CommandBatch:
+        """Executes many Minecraft commands on the client of the current
+        :meth:`session` while keeping its window filled.
+
+        .. seealso:: :meth:`bedrock.session.Session.run_many`
+        """
+        return self.session().run_many(
+            commands,
+            version=version,
+            origin=origin,
+            priority=priority,
+            timeout=timeout,
+        )
+
+    async def broadcast(
+        self,
+        command: str,
+        *,
+        version: str | list[str] | None = None,
+        origin: str = "player",
+        wait: bool = True,
+        priority: Lane = Lane.NORMAL,
+        timeout: float | None = None,
+    ) -> list[CommandResponse | BaseException | None]:
+        """Executes a Minecraft command on every connected client.
+
+        Parameters
+        ----------
+        command
+            The command to execute.
+
+        version
+            The Minecraft version the command syntax relies on.
+
+        origin
+            The type of the origin the command is executed by.
+
+        wait
+            Waits for the responses of every client when awaiting.
+
+        priority
+            The lane of the command. See :class:`bedrock.window.Lane`.
+
+        timeout
+            The amount of seconds after sending the command to wait for its response.
+            The session's default is used if this is ``None``. Pass
+            ``math.inf`` to wait forever.
+
+        Returns
+        -------
+        list
+            The responses in the order of :meth:`sessions`. If sending to a
+            client failed (for example because it disconnected in the
+            meantime), the exception is returned in place of the response.
+        """
+        return await asyncio.gather(
+            *(
+                session.run(  # type: ignore
+                    command,
+                    version=version,
+                    origin=origin,
+                    wait=wait,
+                    priority=priority,
+                    timeout=timeout,
+                )
+                for session in self._sessions
+            ),
+            return_exceptions=True,
+        )
 
     def _dispatch_server_event(self, name: str, ctx: context.ServerContext) -> None:
         assert self._loop is not None
@@ -303,6 +544,77 @@ class Server:
             if event.name == name:
                 self._loop.create_task(event(ctx))
 
+    def _index_game_events(self) -> None:
+        """Maps the names of the game events as they are sent by the client to
+        their handlers and context type."""
+        handlers: dict[str, list[events.GameEvent]] = {}
+        for event in self._game_event_handlers:
+            handlers.setdefault(event.name, []).append(event)
+
+        index = {}
+        for name, group in handlers.items():
+            try:
+                context_type = context.get_game_context(name)
+            except KeyError:
+                if name not in self._unknown_game_events:
+                    self._unknown_game_events.add(name)
+                    warnings.warn(f"unknown event name {name!r}", RuntimeWarning)
+                context_type = context.GameContext
+            index[convert_case.pascal_case(name)] = (tuple(group), context_type)
+        self._game_event_index = index
+
+    def _dispatch_game_event(
+        self, session: Session, event_name: str, data: Mapping[str, Any]
+    ) -> None:
+        """Dispatches a game event.
+
+        Parameters
+        ----------
+        event_name
+            The name of the event as sent by the client (in pascal case).
+        """
+        try:
+            handlers, context_type = self._game_event_index[event_name]
+        except KeyError:
+            return
+        loop = self._loop
+        assert loop is not None
+        logger.debug("triggering %s", event_name)
+        ctx = None
+        for event in handlers:
+            if event.throttle is not None:
+                # the context is only created once the event is passed on
+                event.throttle.submit(
+                    session,
+                    data,
+                    data,
+                    partial(self._trigger_game_event, event, context_type, session),
+                )
+                continue
+            if event.raw:
+                loop.create_task(event.call_raw(data))
+                continue
+            if ctx is None:
+                ctx = context_type(self, data, session=session)
+            loop.create_task(event(ctx))
+
+    def _trigger_game_event(
+        self,
+        event: events.GameEvent,
+        context_type: type[context.GameContext],
+        session: Session,
+        data: Mapping[str, Any],
+    ) -> None:
+        assert self._loop is not None
+        if event.raw:
+            self._loop.create_task(event.call_raw(data))
+        else:
+            self._loop.create_task(event(context_type(self, data, session=session)))
+
+    def _game_event_names(self) -> list[str]:
+        """Returns the names of all game events listened to without duplicates."""
+        return list(dict.fromkeys(event.name for event in self._game_event_handlers))
+
     def start(self, host: str, port: int) -> None:
         """Starts the server.
 
@@ -333,7 +645,7 @@ class Server:
                 pass
             self._loop = asyncio.new_event_loop()
         """
-        self._loop.run_until_complete(server)
+        self._ws_server = self._loop.run_until_complete(server)
         self._dispatch_server_event(
             "ready", context.ReadyContext(self, host=host, port=port)
         )
@@ -345,25 +657,40 @@ class Server:
             self._dispatch_server_event("disconnect", context.DisconnectContext(self))
             for t in asyncio.tasks.all_tasks(self._loop):
                 t.cancel()
-            self._is_connected = False
+            self._sessions.clear()
             self._loop.close()
             if runner is not None:
                 runner.close()
 
     def close(self) -> None:
-        """Closes the server."""
-        if self._ws is None:
+        """Closes the server and the connections to all clients."""
+        if self._ws_server is None:
             raise RuntimeError("server is not running")
-        assert self._loop is not None
-        self._loop.create_task(self._ws.close())
+        self._ws_server.close()
 
     def is_ready(self) -> bool:
         """Returns ``True`` when the server is ready to establish a connection."""
-        return self._ws is not None and self._ws.ws_server.is_serving()
+        return self._ws_server is not None and self._ws_server.is_serving()
 
     def is_connected(self) -> bool:
-        """Returns ``True`` when the server is connected to a client."""
-        return self._is_connected
+        """Returns ``True`` when the server is connected to at least one client."""
+        return bool(self._sessions)
+
+    def in_flight(self) -> int:
+        """Returns the amount of command requests awaiting a response summed
+        up over all clients."""
+        return sum(session.in_flight() for session in self._sessions)
+
+    def oldest_pending_age(self) -> float | None:
+        """Returns the amount of seconds the oldest command request of all
+        clients is awaiting a response or ``None`` if there is no pending
+        command request."""
+        ages = [
+            age
+            for session in self._sessions
+            if (age := session.oldest_pending_age()) is not None
+        ]
+        return max(ages, default=None)
 
     def _assert_connected(self) -> None:
         """
@@ -375,70 +702,22 @@ class Server:
         if not self.is_connected():
             raise RuntimeError("server is not connected to a client")
 
-    async def _websocket_handler(self, server: wss.WebSocketServerProtocol) -> None:
+    async def _websocket_handler(self, ws: wss.WebSocketServerProtocol) -> None:
         logger.debug("handling ws")
 
-        self._ws = server
-        self._is_connected = True
-        self._dispatch_server_event("connect", context.ConnectContext(self))
-
-        for event in self._game_event_handlers:
-            identifier = uuid.uuid4()
-            await self.send(                
-                header = {
-                    "messageType": "commandRequest",
-                    "messagePurpose": "subscribe",
-                    "version": 1,
-                    "requestId": str(identifier),
-                },
-                body = {"eventName": convert_case.pascal_case(event.name)},
-                wait=False
-            )
-
+        session = Session(
+            self,
+            ws,
+            request_ids=self.request_id_factory(),
+            codec=self.codec,
+            ingest=self.ingest_factory(),
+            window=self.window_factory(),
+            timeout=self.command_timeout,
+        )
+        self._sessions.append(session)
         try:
-            async for message in self._ws:
-                logger.debug("processing data ...")
-                data = json.loads(message)
-                await self._process_data(data)
-                logger.debug("processed data")
-        except ConnectionClosedError:
-            self._dispatch_server_event("disconnect", context.DisconnectContext(self))
-            self._is_connected = False
-
-    async def _process_data(self, data: Mapping[str, Any]) -> None:
-        assert self._loop is not None
-
-        header = data["header"]
-        body = data["body"]
-        is_response = header.get("messagePurpose") == "commandResponse"
-        is_error = header.get("messagePurpose") == "error"
-        
-        event_name: str | None
-        if (name := header.get("eventName")) is not None:
-            event_name = convert_case.snake_case(name)
-        else:
-            event_name = None
-
-        logger.debug(f"{self._game_event_handlers}")
-        for event in self._game_event_handlers:
-            if event.name == event_name:
-                logger.debug("triggering event ...")
-                try:
-                    ctx = context.get_game_context(event_name)(self, body)
-                except KeyError:
-                    # from pprint import pprint
-                    # pprint(event_name)
-                    # pprint(body)
-                    warnings.warn(f"unknown event name {event_name!r}", RuntimeWarning)
-                    ctx = context.GameContext(self, body)
-                self._loop.create_task(event(ctx))
-
-        if is_response:
-            self._command_processing_semaphore.release()
-            identifier = uuid.UUID(header["requestId"])
-            for req in self._requests:
-                if req.identifier == identifier:
-                    logger.debug(f"got response for {identifier!r}")
-                    res = response.CommandResponse.parse(data)
-                    req.response.set_result(res)
-                    self._requests.remove(req)
+            await session._handle()
+        finally:
+            # start() forgets all sessions when the server stops
+            if session in self._sessions:
+                self._sessions.remove(session)
@@ -0,0 +1,726 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterable, Iterable, Mapping
+from contextvars import ContextVar
+from functools import partial
+import logging
+import time
+from typing import TYPE_CHECKING, Any, Literal, overload
+
+from attrs import define, field
+import convert_case
+from websockets import server as wss
+from websockets.exceptions import ConnectionClosed
+
+from . import codec, consts, context, response
+from .batch import CommandBatch, FireStats
+from .codec import Codec
+from .envelope import get_envelope
+from .pending import PendingRequests
+from .pipeline import IngestQueue
+from .request import CommandRequest, RequestIdGenerator, RequestIds
+from .response import CommandResponse
+from .window import CommandWindow, Lane, is_queue_full
+
+if TYPE_CHECKING:
+    from .server import Server
+
+
+logger = logging.getLogger(__name__)
+
+_DISPATCH_BATCH = 32
+
+
+_current_session: ContextVar[Session | None] = ContextVar(
+    "current_session", default=None
+)
+
+
+def _retrieve(future: asyncio.Future[Any]) -> None:
+    future.exception()
+
+
+def _fail(request: CommandRequest, error: BaseException) -> None:
+    if not request.response.done():
+        request.response.set_exception(error)
+        # nobody awaits the responses of requests sent without waiting,
+        # which must not be reported as unretrieved errors
+        request.response.add_done_callback(_retrieve)
+
+
+def current_session() -> Session | None:
+    """Returns the session of the client whose event is currently handled.
+
+    Every task started while handling a connection (including event handlers)
+    inherits the session of that connection. ``None`` is returned outside of
+    such a task.
+    """
+    return _current_session.get()
+
+
+@define(eq=False)
+class Session:
+    """A session represents the connection to a single game client.
+
+    A :class:`bedrock.server.Server` creates a session for every client that
+    connects to it. Each session owns its websocket, its pending command
+    requests, its command processing window and its event subscriptions so
+    that clients do not interfere with each other.
+    """
+
+    _server: Server
+    _ws: wss.WebSocketServerProtocol
+    _request_ids: RequestIdGenerator = field(factory=RequestIds, kw_only=True)
+    _codec: Codec = field(default=codec.default, kw_only=True)
+    _ingest: IngestQueue = field(factory=IngestQueue, kw_only=True)
+    _is_connected: bool = field(init=False, default=True)
+    _window: CommandWindow = field(factory=CommandWindow, kw_only=True)
+    _timeout: float | None = field(default=None, kw_only=True)
+    _expiry: asyncio.TimerHandle | None = field(init=False, default=None)
+    # the deadline _expiry is armed for as returned by time.monotonic()
+    _expiry_deadline: float = field(init=False, default=0.0)
+    _requests: PendingRequests = field(init=False, factory=PendingRequests)
+    _subscriptions: set[str] = field(init=False, factory=set)
+    _fire_ids: tuple[RequestIds, ...] = field(
+        init=False, factory=lambda: tuple(RequestIds() for _ in Lane)
+    )
+    _fire_stats: FireStats = field(init=False, factory=FireStats)
+    _skipped_frames: int = field(init=False, default=0)
+    _skipped_bytes: int = field(init=False, default=0)
+
+    @property
+    def server(self) -> Server:
+        """A reference to the server this session belongs to."""
+        return self._server
+
+    @property
+    def remote_address(self) -> Any:
+        """The address of the client."""
+        return self._ws.remote_address
+
+    @property
+    def window(self) -> CommandWindow:
+        """The window of commands the client is processing."""
+        return self._window
+
+    @property
+    def timeout(self) -> float | None:
+        """The amount of seconds to wait for the response of a command by
+        default or ``None`` to wait forever."""
+        return self._timeout
+
+    @property
+    def ingest(self) -> IngestQueue:
+        """The queue of game events received from the client."""
+        return self._ingest
+
+    @property
+    def subscriptions(self) -> frozenset[str]:
+        """The names of the game events the client is subscribed to."""
+        return frozenset(self._subscriptions)
+
+    @property
+    def fire_stats(self) -> FireStats:
+        """The statistics of the commands sent with :meth:`fire`."""
+        return self._fire_stats
+
+    @property
+    def skipped_frames(self) -> int:
+        """The amount of messages received from the client that were dropped
+        without decoding their body because nothing was waiting for it."""
+        return self._skipped_frames
+
+    @property
+    def skipped_bytes(self) -> int:
+        """The total size of the messages counted by :attr:`skipped_frames`.
+
+        Text messages are measured in characters which equals their size in
+        bytes as long as they only contain ASCII characters.
+        """
+        return self._skipped_bytes
+
+    def is_connected(self) -> bool:
+        """Returns ``True`` when the client is still connected."""
+        return self._is_connected
+
+    def in_flight(self) -> int:
+        """Returns the amount of command requests awaiting a response."""
+        return self._requests.in_flight
+
+    def oldest_pending_age(self) -> float | None:
+        """Returns the amount of seconds the oldest command request is awaiting
+        a response or ``None`` if there is no pending command request."""
+        return self._requests.oldest_age()
+
+    def _assert_connected(self) -> None:
+        """
+        Raises
+        ------
+        RuntimeError
+            The client is not connected anymore.
+        """
+        if not self.is_connected():
+            raise RuntimeError("client is not connected anymore")
+
+    @overload
+    async def send(
+        self,
+        header: dict[str, Any],
+        body: dict[str, Any],
+        *,
+        wait: Literal[True] = True,
+        priority: Lane = Lane.NORMAL,
+        timeout: float | None = None,
+    ) -> CommandResponse:
+        ...
+
+    @overload
+    async def send(
+        self,
+        header: dict[str, Any],
+        body: dict[str, Any],
+        *,
+        wait: Literal[False],
+        priority: Lane = Lane.NORMAL,
+        timeout: float | None = None,
+    ) -> None:
+        ...
+
+    async def send(
+        self,
+        header: dict[str, Any],
+        body: dict[str, Any],
+        *,
+        wait: bool = True,
+        priority: Lane = Lane.NORMAL,
+        timeout: float | None = None,
+    ) -> CommandResponse | None:
+        """Sends data to the client.
+
+        Parameters
+        ----------
+        header
+            The header data for the request.
+
+        body
+            The body data for the request.
+
+        wait
+            Waits for a response when awaiting.
+
+        priority
+            The lane of the request.
+
+        timeout
+            The amount of seconds after sending the request to wait for its response.
+            The session's default is used if this is ``None``. Pass
+            ``math.inf`` to wait forever.
+
+        Returns
+        -------
+        CommandResponse
+            The response of the request wrapped in a :external+python:py:class:`asyncio.Future`.
+        """
+        future = await self._submit(header, body, priority, timeout)
+        if wait:
+            logger.debug("waiting for response ...")
+            res = await future
+            logger.debug("got response")
+            return res
+        return None
+
+    async def _submit(
+        self,
+        header: dict[str, Any],
+        body: dict[str, Any],
+        priority: Lane = Lane.NORMAL,
+        timeout: float | None = None,
+    ) -> asyncio.Future[CommandResponse]:
+        """Sends data to the client as soon as a slot of the window is free and
+        returns the future of the response."""
+        request_id = self._request_ids()
+        data = {
+            "header": header | {"version": 1, "requestId": request_id},
+            "body": body,
+        }
+        return await self._submit_frame(
+            request_id, self._codec.dumps(data), priority, timeout
+        )
+
+    async def _submit_command(
+        self,
+        command: str,
+        version: str | list[str] | None,
+        origin: str,
+        priority: Lane = Lane.NORMAL,
+        timeout: float | None = None,
+    ) -> asyncio.Future[CommandResponse]:
+        request_id = self._request_ids()
+        frame = get_envelope(version, origin).render(
+            request_id, command.removeprefix("/")
+        )
+        return await self._submit_frame(request_id, frame, priority, timeout)
+
+    async def _submit_frame(
+        self,
+        request_id: str,
+        frame: str,
+        priority: Lane = Lane.NORMAL,
+        timeout: float | None = None,
+    ) -> asyncio.Future[CommandResponse]:
+        self._assert_connected()
+
+        request = CommandRequest(
+            request_id=request_id,
+            frame=frame,
+            response=asyncio.get_running_loop().create_future(),
+            lane=priority,
+        )
+
+        await self._window.acquire(priority, request.source)
+
+        # The request must be registered before sending it as the response
+        # may arrive while the data is still being sent.
+        self._requests.add(request, self._timeout if timeout is None else timeout)
+        self._schedule_expiry()
+        request.response.add_done_callback(partial(self._reclaim, request))
+        logger.debug("sending data ...")
+        await self._transmit(request)
+        logger.debug("sent data ...")
+        return request.response
+
+    async def subscribe(self, event_name: str) -> CommandResponse:
+        """Subscribes to a game event.
+
+        Parameters
+        ----------
+        event_name
+            The name of the game event to subscribe to.
+        """
+        self._subscriptions.add(event_name)
+        return await self.send(
+            header={"messageType": "commandRequest", "messagePurpose": "subscribe"},
+            body={"eventName": convert_case.pascal_case(event_name)},
+        )
+
+    async def unsubscribe(self, event_name: str) -> CommandResponse:
+        """Unsubscribes to a game event.
+
+        Parameters
+        ----------
+        event_name
+            The name of the game event to unsubcribe.
+        """
+        self._subscriptions.discard(event_name)
+        return await self.send(
+            header={"messageType": "commandRequest", "messagePurpose": "unsubscribe"},
+            body={"eventName": convert_case.pascal_case(event_name)},
+        )
+
+    @overload
+    async def run(
+        self,
+        command: str,
+        *,
+        version: str | list[str] | None = None,
+        origin: str = "player",
+        wait: Literal[True] = True,
+        priority: Lane = Lane.NORMAL,
+        timeout: float | None = None,
+    ) -> CommandResponse:
+        ...
+
+    @overload
+    async def run(
+        self,
+        command: str,
+        *,
+        version: str | list[str] | None = None,
+        origin: str = "player",
+        wait: Literal[False],
+        priority: Lane = Lane.NORMAL,
+        timeout: float | None = None,
+    ) -> None:
+        ...
+
+    async def run(
+        self,
+        command: str,
+        *,
+        version: str | list[str] | None = None,
+        origin: str = "player",
+        wait: bool = True,
+        priority: Lane = Lane.NORMAL,
+        timeout: float | None = None,
+    ) -> CommandResponse | None:
+        """Executes a Minecraft command on the client.
+
+        .. note:: The leading slash (``/``) may be omitted.
+
+        Parameters
+        ----------
+        command
+            The command to execute. For example ``setblock 10 10 10 stone``.
+
+        version
+            The Minecraft version the command syntax relies on. This can
+            usually be ignored.
+
+        origin
+            The type of the origin the command is executed by.
+
+        wait
+            Waits for a response when awaiting.
+
+        priority
+            The lane of the command. See :class:`bedrock.window.Lane`.
+
+        timeout
+            The amount of seconds after sending the command to wait for its response.
+            The session's default is used if this is ``None``. Pass
+            ``math.inf`` to wait forever.
+        """
+        future = await self._submit_command(
+            command, version, origin, priority, timeout
+        )
+        if wait:
+            return await future
+        return None
+
+    async def fire(
+        self,
+        command: str,
+        *,
+        version: str | list[str] | None = None,
+        origin: str = "player",
+        priority: Lane = Lane.NORMAL,
+    ) -> None:
+        """Executes a Minecraft command on the client without keeping track of
+        it.
+
+        Unlike :meth:`run` with ``wait=False``, nothing is kept about the
+        command once it has been sent. Only its slot of the window is
+        accounted for and its response is counted in :attr:`fire_stats`.
+        This makes sending large amounts of commands nobody waits for, like
+        particles or messages, cheaper.
+
+        As nothing is kept, commands the client rejects because its queue is
+        full are not resubmitted and commands are not subject to deadlines.
+        Their round-trip time is not measured either.
+
+        Parameters
+        ----------
+        command
+            The command to execute.
+
+        version
+            The Minecraft version the command syntax relies on.
+
+        origin
+            The type of the origin the command is executed by.
+
+        priority
+            The lane of the command. See :class:`bedrock.window.Lane`.
+        """
+        self._assert_connected()
+        frame = get_envelope(version, origin).render(
+            self._fire_ids[priority](), command.removeprefix("/")
+        )
+        await self._window.acquire(priority)
+        try:
+            await self._ws.send(frame)
+        except BaseException:
+            self._window.release(priority)
+            raise
+        self._fire_stats.sent += 1
+
+    def run_many(
+        self,
+        commands: Iterable[str] | AsyncIterable[str],
+        *,
+        version: str | list[str] | None = None,
+        origin: str = "player",
+        priority: Lane = Lane.NORMAL,
+        timeout: float | None = None,
+    ) -> CommandBatch:
+        """Executes many Minecraft commands while keeping the window of the
+        client filled.
+
+        The commands are taken from ``commands`` lazily, only when there is
+        room for them. This makes it possible to pass a generator producing
+        millions of commands without having all of them in memory.
+
+        Examples
+        --------
+
+        .. code-block:: python
+
+            commands = (f"setblock {x} 0 0 stone" for x in range(100_000))
+
+            # iterate over the responses in the order of the commands ...
+            async for response in session.run_many(commands):
+                ...
+
+            # ... or get all of them as a list ...
+            responses = await session.run_many(commands)
+
+            # ... or discard them and only look at the statistics
+            stats = await session.run_many(commands).drain()
+            print(f"{stats.commands_per_second:.0f} commands/s")
+
+        Parameters
+        ----------
+        commands
+            The commands to execute. This may be an iterable or an
+            asynchronous iterable.
+
+        version
+            The Minecraft version the command syntax relies on.
+
+        origin
+            The type of the origin the command is executed by.
+
+        priority
+            The lane of the commands. See :class:`bedrock.window.Lane`.
+
+        timeout
+            The amount of seconds after sending a command to wait for its response.
+            The session's default is used if this is ``None``. Pass
+            ``math.inf`` to wait forever.
+        """
+        return CommandBatch(
+            self,
+            commands,
+            version=version,
+            origin=origin,
+            priority=priority,
+            timeout=timeout,
+        )
+
+    async def _transmit(self, request: CommandRequest) -> None:
+        """Sends a request which already took a slot of the window."""
+        try:
+            await self._ws.send(request.frame)
+        except BaseException:
+            if self._requests.pop(request.request_id) is not None:
+                self._window.release(request.lane)
+            raise
+
+    async def _resubmit(self, request: CommandRequest, delay: float) -> None:
+        await asyncio.sleep(delay)
+        if request.request_id not in self._requests:
+            return
+        await self._window.acquire(request.lane, request.source)
+        if request.request_id not in self._requests:
+            # expired, cancelled or failed while waiting for the slot
+            self._window.release(request.lane)
+            return
+        self._requests.unpark(request.request_id)
+        logger.debug("resubmitting %r", request.request_id)
+        try:
+            await self._transmit(request)
+        except ConnectionClosed:
+            pass
+
+    async def close(self) -> None:
+        """Closes the connection to the client."""
+        await self._ws.close()
+
+    async def _handle(self) -> None:
+        # Every task created from here on (including event handlers) inherits
+        # this session which is how commands find their way back to the
+        # client that triggered an event.
+        _current_session.set(self)
+        loop = asyncio.get_running_loop()
+        dispatcher = loop.create_task(self._dispatch_events())
+        self._server._dispatch_server_event(
+            "connect", context.ConnectContext(self._server, session=self)
+        )
+        # Subscribing must not wait for the reading below as the responses
+        # free the slots of the window.
+        loop.create_task(self._subscribe_all())
+
+        codec = self._codec
+        server = self._server
+        try:
+            async for message in self._ws:
+                # The body is only decoded if there is a response future or a
+                # handler of the game event waiting for it.
+                header = codec.peek_header(message)
+                if header is None:
+                    data = codec.loads(message)
+                    header = data["header"]
+                else:
+                    data = None
+                purpose = header.get("messagePurpose")
+                if purpose == "commandResponse" or purpose == "error":
+                    if data is None:
+                        data = codec.loads(message)
+                    self._process_response(header, data)
+                elif (name := header.get("eventName")) in server._game_event_index:
+                    if data is None:
+                        data = codec.loads(message)
+                    await self._ingest.put(name, data["body"])
+                elif data is None:
+                    self._skipped_frames += 1
+                    self._skipped_bytes += len(message)
+        except ConnectionClosed:
+            pass
+        finally:
+            self._is_connected = False
+            dispatcher.cancel()
+            self._fail_pending()
+            self._server._dispatch_server_event(
+                "disconnect", context.DisconnectContext(self._server, session=self)
+            )
+
+    def _fail_pending(self) -> None:
+        """Fails the responses of all pending requests once the client
+        disconnected so that nothing waits for them forever."""
+        if self._expiry is not None:
+            self._expiry.cancel()
+            self._expiry = None
+        error = RuntimeError("client is not connected anymore")
+        for request in list(self._requests):
+            parked = self._requests.is_parked(request.request_id)
+            self._requests.pop(request.request_id)
+            if not parked:
+                self._window.release(request.lane)
+            _fail(request, error)
+        self._requests.clear()
+
+    def _schedule_expiry(self) -> None:
+        """Makes sure that the next deadline of a pending request is checked
+        in time."""
+        deadline = self._requests.next_deadline()
+        if deadline is None:
+            return
+        if self._expiry is not None:
+            if self._expiry_deadline <= deadline:
+                return
+            self._expiry.cancel()
+        # loop.time() and time.monotonic() may use different clocks
+        loop = asyncio.get_running_loop()
+        delay = max(deadline - time.monotonic(), 0.0)
+        self._expiry = loop.call_at(loop.time() + delay, self._expire)
+        self._expiry_deadline = deadline
+
+    def _expire(self) -> None:
+        self._expiry = None
+        for request, parked in self._requests.expire():
+            logger.debug("request %r expired", request.request_id)
+            if not parked:
+                self._window.release(request.lane)
+            _fail(
+                request,
+                asyncio.TimeoutError(
+                    f"no response to request {request.request_id!r} in time"
+                ),
+            )
+        self._schedule_expiry()
+
+    def _reclaim(
+        self, request: CommandRequest, future: asyncio.Future[CommandResponse]
+    ) -> None:
+        """Frees the slot of a request whose response is not awaited anymore."""
+        if not future.cancelled():
+            return
+        parked = self._requests.is_parked(request.request_id)
+        if self._requests.pop(request.request_id) is not None:
+            logger.debug("request %r cancelled", request.request_id)
+            if not parked:
+                self._window.release(request.lane)
+
+    async def _subscribe_all(self) -> None:
+        for name in self._server._game_event_names():
+            self._subscriptions.add(name)
+            await self.send(
+                header={
+                    "messageType": "commandRequest",
+                    "messagePurpose": "subscribe",
+                },
+                body={"eventName": convert_case.pascal_case(name)},
+                wait=False,
+            )
+
+    async def _dispatch_events(self) -> None:
+        ingest = self._ingest
+        dispatch = self._server._dispatch_game_event
+        while True:
+            # Dispatching never waits and getting from a non-empty queue does
+            # not either so the loop gets a chance to run the handlers (and
+            # the reader) every few events.
+            for _ in range(_DISPATCH_BATCH):
+                name, body = await ingest.get()
+                try:
+                    dispatch(self, name, body)
+                except Exception:
+                    # e.g. a throttle key failing on an unexpected body must
+                    # not stop the events that follow
+                    logger.exception("failed to dispatch %s", name)
+            await asyncio.sleep(0)
+
+    def _complete_fired(
+        self, request_id: str, body: Mapping[str, Any], *, rejected: bool = False
+    ) -> None:
+        """Frees the slot of a command sent with :meth:`fire`.
+
+        Responses to requests that are not pending anymore (for example
+        because they expired) are ignored.
+        """
+        for lane, ids in enumerate(self._fire_ids):
+            if request_id.startswith(ids.prefix):
+                break
+        else:
+            return
+        stats = self._fire_stats
+        stats.completed += 1
+        if rejected:
+            stats.rejected += 1
+            stats.failed += 1
+            self._window.reject(self._window.max_resubmits, Lane(lane))
+            return
+        if body.get("statusCode", -1) != 0:
+            stats.failed += 1
+        self._window.release(Lane(lane))
+
+    def _process_response(self, header: Mapping[str, Any], data: Mapping[str, Any]) -> None:
+        if (request_id := header.get("requestId")) is None:
+            logger.warning("client sent an error: %r", data["body"])
+            return
+
+        if header["messagePurpose"] == "error" and is_queue_full(data["body"]):
+            req = self._requests.get(request_id)
+            if req is None:
+                self._complete_fired(request_id, data["body"], rejected=True)
+                return
+            if self._requests.is_parked(request_id):
+                # the slot has been given back already
+                return
+            attempt = self._requests.resubmits(request_id)
+            delay = self._window.reject(attempt, req.lane)
+            if delay is not None:
+                self._requests.resubmitted(request_id)
+                self._requests.park(request_id)
+                asyncio.get_running_loop().create_task(self._resubmit(req, delay))
+                return
+            # give up and pass the rejection to the caller
+            self._requests.pop(request_id)
+        else:
+            resubmitted = self._requests.resubmits(request_id)
+            parked = self._requests.is_parked(request_id)
+            entry = self._requests.take(request_id)
+            if entry is None:
+                self._complete_fired(request_id, data["body"])
+                return
+            req, sent_at = entry
+            if not resubmitted:
+                self._window.observe(time.monotonic() - sent_at)
+            if not parked:
+                self._window.release(req.lane)
+
+        logger.debug("got response for %r", request_id)
+        self._window.record(req.lane, time.monotonic() - req.created)
+        if not req.response.done():
+            req.response.set_result(response.CommandResponse.parse(data))
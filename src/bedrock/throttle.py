@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable, Hashable, Mapping
+import time
+from typing import Any, Generic, TypeVar
+from weakref import WeakKeyDictionary
+
+from attrs import define, field
+
+T = TypeVar("T")
+KeyFunction = Callable[[Mapping[str, Any]], Hashable]
+
+
+def player_key(data: Mapping[str, Any]) -> Hashable:
+    """Returns the name of the player a game event belongs to.
+
+    This is the default key of a :class:`Throttle`.
+    """
+    player = data.get("player")
+    if isinstance(player, Mapping):
+        return player.get("name")
+    return player
+
+
+@define
+class _Slot(Generic[T]):
+    last: float = float("-inf")
+    item: T | None = None
+    timer: asyncio.TimerHandle | None = None
+
+
+@define
+class Throttle(Generic[T]):
+    """Limits how often a handler of a game event is triggered per player.
+
+    High-frequency game events such as ``player_transform`` or
+    ``player_travelled`` are sent many times per second for every player.
+    Handlers that only need the latest state can use a throttle to see a
+    bounded rate of events no matter how many players are online.
+
+    Events are grouped by a key (the player by default) and by the client
+    they were received from.
+
+    Attributes
+    ----------
+    coalesce
+        If set, events are collected for that many seconds and only the
+        latest one of each player is passed to the handler.
+
+    max_rate
+        If set, the handler is triggered at most that many times per second
+        for each player. Without ``coalesce`` any event exceeding the rate is
+        dropped. With ``coalesce`` the latest event is passed on as soon as
+        the rate allows it.
+
+    key
+        Returns the key events are grouped by from the body of an event.
+    """
+
+    coalesce: float | None = None
+    max_rate: float | None = None
+    key: KeyFunction = player_key
+    _slots: WeakKeyDictionary[Any, dict[Hashable, _Slot[T]]] = field(
+        init=False, factory=WeakKeyDictionary
+    )
+    _dispatched: int = field(init=False, default=0)
+    _merged: int = field(init=False, default=0)
+    _dropped: int = field(init=False, default=0)
+
+    @property
+    def dispatched(self) -> int:
+        """The amount of events passed to the handler."""
+        return self._dispatched
+
+    @property
+    def merged(self) -> int:
+        """The amount of events replaced by a later event of the same player."""
+        return self._merged
+
+    @property
+    def dropped(self) -> int:
+        """The amount of events dropped because they exceeded :attr:`max_rate`."""
+        return self._dropped
+
+    def submit(
+        self,
+        scope: Any,
+        data: Mapping[str, Any],
+        item: T,
+        dispatch: Callable[[T], None],
+    ) -> None:
+        """Passes an event on to ``dispatch`` now, later or not at all.
+
+        Parameters
+        ----------
+        scope
+            The object events are grouped by in addition to :attr:`key`,
+            usually the session the event was received from. It must be
+            weakly referenceable.
+
+        data
+            The body of the event.
+
+        item
+            The object passed to ``dispatch``.
+
+        dispatch
+            Triggers the handler.
+        """
+        slots = self._slots.get(scope)
+        if slots is None:
+            slots = self._slots[scope] = {}
+        key = self.key(data)
+        slot = slots.get(key)
+        if slot is None:
+            slot = slots[key] = _Slot()
+
+        now = time.monotonic()
+        interval = 1 / self.max_rate if self.max_rate else 0.0
+
+        if self.coalesce is None:
+            if now - slot.last < interval:
+                self._dropped += 1
+                return
+            slot.last = now
+            self._dispatched += 1
+            dispatch(item)
+            return
+
+        if slot.timer is not None:
+            slot.item = item
+            self._merged += 1
+            return
+
+        slot.item = item
+        delay = max(self.coalesce, slot.last + interval - now)
+        slot.timer = asyncio.get_running_loop().call_later(
+            delay, self._flush, slot, dispatch
+        )
+
+    def _flush(self, slot: _Slot[T], dispatch: Callable[[T], None]) -> None:
+        item = slot.item
+        slot.item = None
+        slot.timer = None
+        slot.last = time.monotonic()
+        self._dispatched += 1
+        dispatch(item)  # type: ignore[arg-type]
@@ -2,11 +2,12 @@ from __future__ import annotations
 
 from collections.abc import Iterable, Mapping
 from enum import Enum
-import json
-from typing import Literal, NewType
+from typing import Literal, NamedTuple, NewType
 
 from attrs import define
 
+from . import codec
+
 
 def rawtext(
     text: str
@@ -27,6 +28,11 @@ def rawtext(
         Either just a string or an iterable of mappings beeing
         valid rawtext parts.
 
+    .. note::
+
+        The whitespace of the returned JSON depends on the
+        :data:`bedrock.codec.default` codec.
+
     Examples
     --------
 
@@ -40,9 +46,9 @@ def rawtext(
 
     """
     if isinstance(text, str):
-        return json.dumps({"rawtext": [{"text": text}]})
+        return codec.default.dumps({"rawtext": [{"text": text}]})
     else:
-        return json.dumps({"rawtext": text})
+        return codec.default.dumps({"rawtext": text})
 
 
 class TargetSelector(str, Enum):
@@ -137,6 +143,28 @@ class LocalCoordinate:
         return cls(numeric(n))
 
 
+class Vector(NamedTuple):
+    """An immutable three-dimensional vector such as the position of a player.
+
+    Unlike :data:`WorldCoordinates` a vector is a plain tuple of floats which
+    makes it cheap to create and compare.
+
+    Examples
+    --------
+    .. code-block:: python
+
+        >>> from bedrock.utils import Vector
+        >>> position = Vector(12.5, 64.0, -118.3)
+        >>> position.y
+        64.0
+        >>> x, y, z = position
+    """
+
+    x: float
+    y: float
+    z: float
+
+
 WorldCoordinates = NewType(
     "WorldCoordinates", tuple[WorldCoordinate, WorldCoordinate, WorldCoordinate]
 )
@@ -0,0 +1,543 @@
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict, deque
+from collections.abc import Mapping
+from contextvars import ContextVar
+from enum import IntEnum
+import math
+import time
+from typing import Any
+
+from attrs import define, field
+
+from . import consts
+
+
+def is_queue_full(body: Mapping[str, Any]) -> bool:
+    """Returns ``True`` when the body of an ``error`` message sent by the
+    client says that a command request was rejected because the client was
+    already processing :data:`bedrock.consts.MAX_COMMAND_PROCESSING` commands.
+    """
+    message = body.get("statusMessage")
+    return isinstance(message, str) and "too many commands" in message.lower()
+
+
+class Lane(IntEnum):
+    """The priority of a command request.
+
+    When slots of the :class:`CommandWindow` become free, waiting requests of
+    a higher lane are sent first.
+    """
+
+    INTERACTIVE = 0
+    """Commands a player waits for, like replies to chat messages."""
+
+    NORMAL = 1
+    """The default lane."""
+
+    BULK = 2
+    """Large amounts of commands nobody waits for, like building structures."""
+
+
+_LANES = tuple(Lane)
+
+
+@define(eq=False)
+class Source:
+    """Where commands come from.
+
+    Each call of an event handler is a separate source, named after the
+    event. Tasks started by the handler inherit its source. The
+    :class:`CommandWindow` serves waiting sources in turns so that a source
+    sending lots of commands does not hold up the others.
+
+    Attributes
+    ----------
+    name
+        The name statistics of the source are collected under. Sources with
+        the same name are still served separately.
+    """
+
+    name: str
+
+
+_DEFAULT_SOURCE = Source("default")
+
+_current_source: ContextVar[Source] = ContextVar(
+    "current_source", default=_DEFAULT_SOURCE
+)
+
+
+def current_source() -> Source:
+    """Returns the source of the commands sent by the current task.
+
+    Outside of event handlers this is a source named ``default``.
+    """
+    return _current_source.get()
+
+
+def set_source(source: Source) -> None:
+    """Sets the source of the commands sent by the current task and the
+    tasks it starts from now on."""
+    _current_source.set(source)
+
+
+@define
+class SourceStats:
+    """Statistics of the commands of all sources with the same name."""
+
+    submitted: int = 0
+    """The amount of commands that took a slot of the window."""
+
+    waiting: int = 0
+    """The amount of commands waiting for a free slot."""
+
+    waited: float = 0.0
+    """The total amount of seconds commands waited for a free slot."""
+
+    @property
+    def mean_wait(self) -> float:
+        """The average amount of seconds a command waited for a free slot."""
+        if self.submitted <= 0:
+            return 0.0
+        return self.waited / self.submitted
+
+
+@define
+class Latencies:
+    """The most recent latencies of command requests.
+
+    Attributes
+    ----------
+    size
+        The amount of latencies kept.
+    """
+
+    size: int = 1024
+    _samples: deque[float] = field(init=False)
+    _count: int = field(init=False, default=0)
+
+    def __attrs_post_init__(self) -> None:
+        self._samples = deque(maxlen=self.size)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    @property
+    def count(self) -> int:
+        """The amount of latencies recorded in total."""
+        return self._count
+
+    def record(self, seconds: float) -> None:
+        """Records the latency of a command request."""
+        self._samples.append(seconds)
+        self._count += 1
+
+    def percentile(self, percent: float) -> float | None:
+        """Returns the latency in seconds that the given percentage of the
+        recent latencies does not exceed or ``None`` if nothing has been
+        recorded yet."""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = math.ceil(percent / 100 * len(ordered)) - 1
+        return ordered[min(max(index, 0), len(ordered) - 1)]
+
+
+@define
+class LaneStats:
+    """A snapshot of the state of a :class:`Lane` of a :class:`CommandWindow`."""
+
+    in_use: int
+    """The amount of slots taken by commands of the lane."""
+
+    waiting: int
+    """The amount of commands of the lane waiting for a free slot."""
+
+    latencies: Latencies
+    """The seconds passed between submitting commands of the lane and
+    receiving their response, including the time waited for a slot."""
+
+
+_DEFAULT_RESERVE = {Lane.NORMAL: 0.05, Lane.BULK: 0.2}
+
+
+@define
+class AdaptiveLimit:
+    """Adapts the limit of a :class:`CommandWindow` to how fast the client
+    processes commands.
+
+    The client processes commands one after another, so every command in
+    flight beyond what the client keeps up with only waits in its queue. The
+    round-trip time of each command (from sending it to receiving its
+    response) is compared to the lowest round-trip time measured recently,
+    which is the time a command takes when nothing is queued. When the
+    smoothed round-trip time exceeds it by more than :attr:`tolerance` or
+    the client rejects a command because its queue is full, the limit is
+    multiplied by :attr:`decrease`, at most once per round trip. While the
+    window is full and the round-trip time is fine, the limit grows by
+    :attr:`increase` per round trip.
+
+    .. code-block:: python
+
+        from bedrock.server import Server
+        from bedrock.window import AdaptiveLimit, CommandWindow
+
+        app = Server(window_factory=lambda: CommandWindow(controller=AdaptiveLimit()))
+
+    Attributes
+    ----------
+    min_limit
+        The lowest limit.
+
+    max_limit
+        The highest limit. The client does not accept more than
+        :data:`bedrock.consts.MAX_COMMAND_PROCESSING` commands.
+
+    increase
+        The amount the limit grows by per round trip.
+
+    decrease
+        The factor the limit is multiplied with when backing off.
+
+    tolerance
+        How many times the lowest round-trip time the smoothed round-trip
+        time may reach before backing off.
+
+    period
+        The amount of responses after which the lowest round-trip time is
+        measured anew, so that it follows lasting changes of the connection.
+    """
+
+    min_limit: int = 4
+    max_limit: int = consts.MAX_COMMAND_PROCESSING
+    increase: float = 1.0
+    decrease: float = 0.7
+    tolerance: float = 2.0
+    period: int = 1000
+    _smoothed: float | None = field(init=False, default=None)
+    _base: float | None = field(init=False, default=None)
+    _period_min: float | None = field(init=False, default=None)
+    _samples: int = field(init=False, default=0)
+    _credit: float = field(init=False, default=0.0)
+    _decreased: float = field(init=False, default=float("-inf"))
+
+    @property
+    def smoothed_rtt(self) -> float | None:
+        """The exponentially smoothed round-trip time in seconds."""
+        return self._smoothed
+
+    @property
+    def base_rtt(self) -> float | None:
+        """The lowest round-trip time in seconds measured recently."""
+        return self._base
+
+    def update(self, window: CommandWindow, rtt: float) -> None:
+        """Adapts the limit of a window to the round-trip time of a command."""
+        if self._smoothed is None:
+            self._smoothed = rtt
+        else:
+            self._smoothed += (rtt - self._smoothed) / 8
+        if self._base is None or rtt < self._base:
+            self._base = rtt
+        if self._period_min is None or rtt < self._period_min:
+            self._period_min = rtt
+        self._samples += 1
+        if self._samples >= self.period:
+            self._base = self._period_min
+            self._period_min = None
+            self._samples = 0
+
+        if self._smoothed > self._base * self.tolerance:
+            self._back_off(window)
+        elif window.in_use + 1 >= window.limit:
+            # only probe when the limit is what holds commands back
+            self._credit += self.increase / window.limit
+            if self._credit >= 1.0:
+                self._credit -= 1.0
+                window.limit = min(
+                    window.limit + 1, self.max_limit, consts.MAX_COMMAND_PROCESSING
+                )
+
+    def reject(self, window: CommandWindow) -> None:
+        """Backs off because the client rejected a command."""
+        self._back_off(window)
+
+    def _back_off(self, window: CommandWindow) -> None:
+        now = time.monotonic()
+        if self._smoothed is not None and now - self._decreased < self._smoothed:
+            return
+        self._decreased = now
+        self._credit = 0.0
+        window.limit = max(math.floor(window.limit * self.decrease), self.min_limit)
+
+
+@define
+class CommandWindow:
+    """Keeps track of the command requests a client is processing.
+
+    The client only processes a limited amount of commands at a time (see
+    :data:`bedrock.consts.MAX_COMMAND_PROCESSING`). Each command request
+    takes a slot of the window before it is sent and returns it once the
+    client responded to it, no matter if that response is a
+    ``commandResponse`` or an ``error``.
+
+    Every request belongs to a :class:`Lane`. Free slots go to the waiting
+    requests of the highest lane first. Within a lane, the :class:`Source`
+    of each request is taken into account: sources take turns, and requests
+    of the same source are served in the order they started waiting. A
+    request of a source that has not been waiting so far gets a slot once
+    every other waiting source of its lane got one. Lower lanes may only use a
+    part of the window (see :attr:`reserve`) so that there are always slots
+    left for requests of higher lanes, even while a large batch of bulk
+    commands keeps the window filled.
+
+    Commands the client rejected because its queue was full are resubmitted
+    after a delay which grows exponentially with every rejection of the same
+    command.
+
+    Attributes
+    ----------
+    limit
+        The maximum amount of commands in flight.
+
+    reserve
+        The share of the window each lane must leave free for higher lanes.
+        By default, bulk commands use at most 80% of the window and normal
+        commands at most 95%. Assign a new mapping to change it.
+
+    resubmit_delay
+        The delay in seconds before a rejected command is resubmitted for the
+        first time.
+
+    max_resubmit_delay
+        The maximum delay in seconds before a rejected command is resubmitted.
+
+    max_resubmits
+        The amount of times a command is resubmitted before the rejection is
+        passed to the caller.
+
+    controller
+        Adapts :attr:`limit` to the round-trip time of the commands. The
+        limit stays fixed without a controller.
+    """
+
+    limit: int = consts.MAX_COMMAND_PROCESSING
+    reserve: Mapping[Lane, float] = field(factory=lambda: dict(_DEFAULT_RESERVE))
+    resubmit_delay: float = 0.05
+    max_resubmit_delay: float = 2.0
+    max_resubmits: int = 10
+    controller: AdaptiveLimit | None = None
+    _rtt: Latencies = field(init=False, factory=Latencies)
+    _in_use: int = field(init=False, default=0)
+    _lane_in_use: list[int] = field(init=False, factory=lambda: [0] * len(Lane))
+    _waiters: tuple[OrderedDict[Source, deque[asyncio.Future[None]]], ...] = field(
+        init=False, factory=lambda: tuple(OrderedDict() for _ in Lane)
+    )
+    _source_stats: dict[str, SourceStats] = field(init=False, factory=dict)
+    _latencies: tuple[Latencies, ...] = field(
+        init=False, factory=lambda: tuple(Latencies() for _ in Lane)
+    )
+    _waiting: int = field(init=False, default=0)
+    _rejections: int = field(init=False, default=0)
+    _capacities: tuple[int, ...] = field(init=False, default=())
+    _capacities_key: tuple[int, int] = field(init=False, default=(0, 0))
+
+    @property
+    def in_use(self) -> int:
+        """The amount of slots taken by commands in flight."""
+        return self._in_use
+
+    @property
+    def available(self) -> int:
+        """The amount of free slots."""
+        return max(self.limit - self._in_use, 0)
+
+    @property
+    def waiting(self) -> int:
+        """The amount of tasks waiting for a free slot."""
+        return self._waiting
+
+    @property
+    def rejections(self) -> int:
+        """The amount of commands the client rejected because its queue was full."""
+        return self._rejections
+
+    @property
+    def rtt(self) -> Latencies:
+        """The seconds passed between sending commands and receiving their
+        response. Commands that have been resubmitted are left out as it is
+        unknown which submission the response belongs to."""
+        return self._rtt
+
+    def observe(self, rtt: float) -> None:
+        """Records the round-trip time of a command and lets the
+        :attr:`controller` adapt the limit."""
+        self._rtt.record(rtt)
+        if self.controller is not None:
+            self.controller.update(self, rtt)
+            # the limit may have grown
+            self._wake()
+
+    def capacity(self, lane: Lane) -> int:
+        """Returns the amount of slots requests of a lane may take at most."""
+        # computed once per limit and reserve as this is checked for every
+        # request
+        key = (self.limit, id(self.reserve))
+        if self._capacities_key != key:
+            self._capacities = tuple(
+                max(math.floor(self.limit * (1.0 - self.reserve.get(other, 0.0))), 1)
+                for other in Lane
+            )
+            self._capacities_key = key
+        return self._capacities[lane]
+
+    def lane_stats(self, lane: Lane) -> LaneStats:
+        """Returns the state of a lane."""
+        return LaneStats(
+            in_use=self._lane_in_use[lane],
+            waiting=sum(len(waiters) for waiters in self._waiters[lane].values()),
+            latencies=self._latencies[lane],
+        )
+
+    def source_stats(self) -> Mapping[str, SourceStats]:
+        """Returns the statistics of the sources by their name."""
+        return self._source_stats
+
+    def record(self, lane: Lane, seconds: float) -> None:
+        """Records the latency of a request of a lane."""
+        self._latencies[lane].record(seconds)
+
+    def _blocked(self, lane: Lane) -> bool:
+        """Returns ``True`` if a request of the lane has to wait, either
+        because the lane is full or because requests of the same or a higher
+        lane are waiting already."""
+        if self._in_use >= self.capacity(lane):
+            return True
+        if self._waiting:
+            for other in range(lane + 1):
+                if self._waiters[other]:
+                    return True
+        return False
+
+    async def acquire(
+        self, lane: Lane = Lane.NORMAL, source: Source | None = None
+    ) -> None:
+        """Takes a slot of the window and waits for one to be released if
+        there is none left for the lane.
+
+        Parameters
+        ----------
+        lane
+            The lane of the request.
+
+        source
+            The source of the request. Defaults to :func:`current_source`.
+        """
+        if source is None:
+            source = _current_source.get()
+        stats = self._source_stats.get(source.name)
+        if stats is None:
+            stats = self._source_stats[source.name] = SourceStats()
+        stats.submitted += 1
+        if not self._blocked(lane):
+            self._take(lane)
+            return
+
+        waiter: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        sources = self._waiters[lane]
+        waiters = sources.get(source)
+        if waiters is None:
+            waiters = sources[source] = deque()
+        waiters.append(waiter)
+        self._waiting += 1
+        stats.waiting += 1
+        started = time.monotonic()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            stats.submitted -= 1
+            if waiter.done() and not waiter.cancelled():
+                # the slot has been handed over already
+                self.release(lane)
+            else:
+                try:
+                    waiters.remove(waiter)
+                    self._waiting -= 1
+                    if not waiters and sources.get(source) is waiters:
+                        del sources[source]
+                except ValueError:
+                    # already skipped by release()
+                    pass
+            raise
+        finally:
+            stats.waiting -= 1
+            stats.waited += time.monotonic() - started
+
+    def _take(self, lane: Lane) -> None:
+        self._in_use += 1
+        self._lane_in_use[lane] += 1
+
+    def release(self, lane: Lane = Lane.NORMAL) -> None:
+        """Returns a slot of a lane to the window.
+
+        Raises
+        ------
+        ValueError
+            No slot of the lane is taken.
+        """
+        if self._lane_in_use[lane] <= 0:
+            raise ValueError("window released too many times")
+        self._in_use -= 1
+        self._lane_in_use[lane] -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        """Hands free slots over to waiting tasks, highest lane first and
+        sources of the same lane in turns.
+
+        The slots are taken on behalf of the waiting tasks so that they cannot
+        be taken by a task which did not wait.
+        """
+        if not self._waiting:
+            return
+        for lane in _LANES:
+            sources = self._waiters[lane]
+            while sources and self._in_use < self.capacity(lane):
+                source, waiters = next(iter(sources.items()))
+                waiter = waiters.popleft()
+                if waiters:
+                    sources.move_to_end(source)
+                else:
+                    del sources[source]
+                self._waiting -= 1
+                if not waiter.done():
+                    self._take(lane)
+                    waiter.set_result(None)
+
+    def reject(self, attempt: int, lane: Lane = Lane.NORMAL) -> float | None:
+        """Returns the slot of a command the client rejected because its queue
+        was full.
+
+        Parameters
+        ----------
+        attempt
+            The amount of times the command has been rejected before.
+
+        lane
+            The lane of the command.
+
+        Returns
+        -------
+        float | None
+            The delay in seconds after which the command should be resubmitted
+            or ``None`` if it should not be resubmitted anymore.
+        """
+        self._rejections += 1
+        if self.controller is not None:
+            self.controller.reject(self)
+        self.release(lane)
+        if attempt >= self.max_resubmits:
+            return None
+        return min(self.resubmit_delay * 2.0**attempt, self.max_resubmit_delay)